@@ -14,7 +14,7 @@ from django.utils import timezone
 from openai import OpenAI
 
 from apps.messaging.models import Conversation, Message, MessageSender
-from apps.knowledge.models import KnowledgeBase, FAQ
+from apps.knowledge.services import get_knowledge_snapshot
 from apps.inventory.firewall import InventoryContextFirewall
 from .models import AILog
 from .language_service import LanguageService, LanguageCode, detect_language
@@ -1537,39 +1537,19 @@ Consider irrelevant if:
         """Get knowledge base context for the organization/location."""
         context_parts = []
 
-        # Get knowledge base
+        # Get knowledge base (cached; see knowledge.services)
         try:
-            # Get location-specific knowledge first (overrides org-level)
-            if self.location:
-                kb = KnowledgeBase.objects.filter(
-                    organization=self.organization,
-                    location=self.location
-                ).first()
+            knowledge = get_knowledge_snapshot(self.organization.id, self.location.id if self.location else None)
+
+            # Location-specific knowledge first (overrides org-level)
+            for kb in (knowledge['location_kb'], knowledge['org_kb']):
                 if kb:
                     context_parts.append(self._format_knowledge_base(kb))
 
-            # Get org-level knowledge
-            kb = KnowledgeBase.objects.filter(
-                organization=self.organization,
-                location__isnull=True
-            ).first()
-            if kb:
-                context_parts.append(self._format_knowledge_base(kb))
-
-            # Get FAQs from knowledge bases
-            faqs = FAQ.objects.filter(
-                knowledge_base__organization=self.organization,
-                is_active=True
-            )
-            if self.location:
-                faqs = faqs.filter(
-                    Q(knowledge_base__location=self.location) | Q(knowledge_base__location__isnull=True)
-                )
-
-            if faqs.exists():
+            if knowledge['faqs']:
                 faq_text = "\n\nFREQUENTLY ASKED QUESTIONS:\n"
-                for faq in faqs[:20]:  # Limit FAQs
-                    faq_text += f"\nQ: {faq.question}\nA: {faq.answer}\n"
+                for question, answer in knowledge['faqs']:
+                    faq_text += f"\nQ: {question}\nA: {answer}\n"
                 context_parts.append(faq_text)
 
         except Exception as e:
@@ -1580,21 +1560,21 @@ Consider irrelevant if:
 
         return "\n".join(context_parts)
 
-    def _format_knowledge_base(self, kb: 'KnowledgeBase') -> str:
-        """Format knowledge base for prompt."""
+    def _format_knowledge_base(self, kb: Dict[str, Any]) -> str:
+        """Format knowledge base (a snapshot dict of KnowledgeBase fields) for prompt."""
         parts = []
 
-        if kb.business_description:
-            parts.append(f"ABOUT US:\n{kb.business_description}")
+        if kb['business_description']:
+            parts.append(f"ABOUT US:\n{kb['business_description']}")
 
-        if kb.opening_hours:
-            parts.append(f"\nOPENING HOURS:\n{json.dumps(kb.opening_hours, indent=2)}")
+        if kb['opening_hours']:
+            parts.append(f"\nOPENING HOURS:\n{json.dumps(kb['opening_hours'], indent=2)}")
 
-        if kb.contact_info:
-            parts.append(f"\nCONTACT INFO:\n{json.dumps(kb.contact_info, indent=2)}")
+        if kb['contact_info']:
+            parts.append(f"\nCONTACT INFO:\n{json.dumps(kb['contact_info'], indent=2)}")
 
-        if kb.additional_info:
-            parts.append(f"\nADDITIONAL INFO:\n{kb.additional_info}")
+        if kb['additional_info']:
+            parts.append(f"\nADDITIONAL INFO:\n{kb['additional_info']}")
 
         return "\n".join(parts)
 
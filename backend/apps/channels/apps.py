@@ -5,3 +5,6 @@ class ChannelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.channels'
     verbose_name = 'Messaging Channels'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -8,6 +8,7 @@ import logging
 import requests
 from typing import Optional, Dict, Any
 from django.conf import settings
+from django.db import IntegrityError, transaction
 
 from apps.messaging.models import Conversation, Message, Channel, ConversationState, MessageSender
 from apps.accounts.models import Organization
@@ -149,23 +150,31 @@ class InstagramService:
         )
         
         # Create message
-        msg = Message.objects.create(
-            conversation=conversation,
-            sender=MessageSender.CUSTOMER,
-            content=content,
-            channel_message_id=message_id,  # FIXED: Use channel_message_id for deduplication
-            ai_metadata={
-                'ig_message_id': message_id,
-                'sender_id': sender_id,
-                'recipient_id': recipient_id,
-                'timestamp': timestamp
-            }
-        )
+        try:
+            # Savepoint, so a duplicate doesn't poison an outer transaction
+            with transaction.atomic():
+                msg = Message.objects.create(
+                    conversation=conversation,
+                    sender=MessageSender.CUSTOMER,
+                    content=content,
+                    channel_message_id=message_id,  # FIXED: Use channel_message_id for deduplication
+                    ai_metadata={
+                        'ig_message_id': message_id,
+                        'sender_id': sender_id,
+                        'recipient_id': recipient_id,
+                        'timestamp': timestamp
+                    }
+                )
+        except IntegrityError:
+            # Meta redelivered a message that is already stored
+            # (msg_channel_msgid_uniq); it was answered the first time
+            logger.info(f"Duplicate Instagram message {message_id} ignored")
+            return
         
         # Process with AI if not in human handoff
         if conversation.state not in [ConversationState.HUMAN_HANDOFF]:
             conversation.state = ConversationState.AI_HANDLING
-            conversation.save()
+            conversation.save(update_fields=['state', 'updated_at'])
             self._process_with_ai(conversation, msg)
         
         logger.info(f"✅ Instagram message received from {sender_name} ({sender_id}): {content[:50]}...")
@@ -271,7 +280,7 @@ class InstagramService:
                     if alert:
                         logger.info(f"🚨 Instagram handoff alert created: {alert.id}")
                         conversation.state = ConversationState.HUMAN_HANDOFF
-                        conversation.save()
+                        conversation.save(update_fields=['state', 'updated_at'])
                 
                 # Send via Instagram
                 logger.info(f"📤 Sending Instagram message to {conversation.customer_name} in {detected_lang}")
@@ -282,7 +291,7 @@ class InstagramService:
                 )
                 
                 conversation.state = ConversationState.AWAITING_USER
-                conversation.save()
+                conversation.save(update_fields=['state', 'updated_at'])
                 
         except Exception as e:
             logger.exception(f"Error processing with AI: {e}")
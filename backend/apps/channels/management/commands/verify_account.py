@@ -76,7 +76,7 @@ class Command(BaseCommand):
             try:
                 from apps.knowledge.models import KnowledgeBase, FAQ
                 kb_count = KnowledgeBase.objects.filter(organization=org).count()
-                faq_count = FAQ.objects.filter(knowledge_base__organization=org).count()
+                faq_count = FAQ.objects.for_organizations([org.id]).count()
                 out(f"   knowledge_base entries: {kb_count}, FAQs: {faq_count}")
             except Exception as e:
                 out(f"   knowledge: (could not query: {e})")
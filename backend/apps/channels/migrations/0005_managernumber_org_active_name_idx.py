@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("channels", "0004_alter_webhooklog_source_twilioconfig"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="managernumber",
+            index=models.Index(
+                fields=["organization", "-is_active", "name"],
+                name="mn_org_active_name_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("channels", "0005_managernumber_org_active_name_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="managerquery",
+            index=models.Index(
+                fields=["organization", "-created_at"], name="mq_org_created_idx"
+            ),
+        ),
+    ]
@@ -241,6 +241,10 @@ class ManagerNumber(models.Model):
         db_table = 'channel_manager_numbers'
         unique_together = ['organization', 'phone_number']
         ordering = ['-is_active', 'name']
+        indexes = [
+            # Matches the dashboard list: filter by org, order by default ordering
+            models.Index(fields=['organization', '-is_active', 'name'], name='mn_org_active_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.phone_number}) - {self.organization.name}"
@@ -462,6 +466,7 @@ class ManagerQuery(models.Model):
         indexes = [
             models.Index(fields=['conversation', 'status']),
             models.Index(fields=['manager', 'status']),
+            models.Index(fields=['organization', '-created_at'], name='mq_org_created_idx'),
         ]
 
     def __str__(self):
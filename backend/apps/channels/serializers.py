@@ -86,6 +86,18 @@ class WebhookLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class WebhookLogListSerializer(serializers.ModelSerializer):
+    """Lightweight serializer for listing webhook logs (no raw payload)."""
+
+    class Meta:
+        model = WebhookLog
+        fields = [
+            'id', 'source', 'organization',
+            'is_processed', 'error_message', 'created_at'
+        ]
+        read_only_fields = fields
+
+
 class ManagerNumberSerializer(serializers.ModelSerializer):
     """Serializer for Manager WhatsApp Numbers."""
     user_email = serializers.EmailField(source='user.email', read_only=True)
@@ -0,0 +1,25 @@
+"""
+Channel config signal receivers.
+
+Drop the cached WhatsAppConfig (see whatsapp_service.get_active_config) when it
+changes, so webhooks and dashboard checks never serve a stale config.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import WhatsAppConfig
+from .whatsapp_service import config_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=WhatsAppConfig)
+@receiver(post_delete, sender=WhatsAppConfig)
+def invalidate_whatsapp_config_cache(sender, instance, **kwargs):
+    try:
+        cache.delete(config_cache_key(instance.organization_id))
+    except Exception:
+        logger.warning('Could not invalidate WhatsApp config cache for org=%s', instance.organization_id)
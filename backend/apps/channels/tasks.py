@@ -0,0 +1,50 @@
+"""
+Channel Celery tasks.
+
+- process_whatsapp_ai_message_task : queued on_commit by the WhatsApp webhook so
+  OpenAI + the outbound Graph API send run off the request path.
+- log_webhook_task                 : writes the WhatsApp webhook's WebhookLog row
+  once the request has been answered.
+"""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def process_whatsapp_ai_message_task(config_id, message_id):
+    """Generate and send the AI reply for one inbound WhatsApp message."""
+    from apps.messaging.models import Message, ConversationState
+    from .models import WhatsAppConfig
+    from .whatsapp_service import WhatsAppService
+
+    config = (
+        WhatsAppConfig.objects.select_related('organization')
+        .filter(pk=config_id, is_active=True)
+        .first()
+    )
+    message = Message.objects.select_related('conversation').filter(pk=message_id).first()
+    if config is None or message is None:
+        logger.warning("Skipping WhatsApp AI reply: config %s / message %s not found", config_id, message_id)
+        return
+    # A human may have taken over while the task sat in the queue
+    if message.conversation.state == ConversationState.HUMAN_HANDOFF:
+        return
+    WhatsAppService(config)._process_with_ai(message.conversation, message)
+
+
+@shared_task
+def log_webhook_task(source, organization_id, headers, body, is_processed=False, error_message=''):
+    """Insert one WebhookLog row for a webhook the view has already handled."""
+    from .models import WebhookLog
+
+    WebhookLog.objects.create(
+        source=source,
+        organization_id=organization_id,
+        headers=headers,
+        body=body,
+        is_processed=is_processed,
+        error_message=error_message,
+    )
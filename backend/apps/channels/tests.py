@@ -4,14 +4,20 @@ Tests for the Twilio WhatsApp integration.
 import base64
 import hashlib
 import hmac
+import json
 from unittest.mock import patch, MagicMock
 
-from django.test import TestCase, Client
+from django.db import DatabaseError
+from django.test import TestCase, Client, override_settings
+from rest_framework.test import APIClient
 
-from apps.accounts.models import Organization
+from apps.accounts.models import Organization, OrganizationMembership, User
 from apps.messaging.models import Conversation, Message, Channel, MessageSender
-from apps.channels.models import TwilioConfig, WebhookLog
+from apps.channels.models import (
+    WhatsAppConfig, TwilioConfig, WebhookLog, ManagerNumber, TemporaryOverride, ManagerQuery,
+)
 from apps.channels.twilio_service import TwilioService
+from apps.channels.whatsapp_service import WhatsAppService, get_active_config
 
 
 def twilio_signature(auth_token: str, url: str, params: dict) -> str:
@@ -113,6 +119,11 @@ class TwilioServiceInboundTest(TestCase):
         self.assertEqual(ai_msg.content, "Hello, how can I help?")
         mock_send.assert_called_once_with("+15551234567", "Hello, how can I help?")
 
+        # Twilio retries the same webhook: stored once, answered once
+        self.assertTrue(TwilioService(self.config).process_webhook(params))
+        self.assertEqual(Message.objects.filter(channel_message_id="SMabc").count(), 1)
+        self.assertEqual(mock_ai.process_message.call_count, 1)
+
     def test_status_update_path(self):
         # Create a message to update
         conv = Conversation.objects.create(
@@ -313,3 +324,417 @@ class TwilioWebhookViewTest(TestCase):
         self.assertIsNotNone(log)
         self.assertEqual(log.organization_id, self.org.id)
         self.assertTrue(log.is_processed)
+
+
+class WebhookLogViewSetTest(TestCase):
+    """Webhook log list is paginated and leaves out the raw payload."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name="Log Org")
+        self.user = User.objects.create_user(
+            email="logs@test.test", username="logs", password="pw",
+        )
+        OrganizationMembership.objects.create(
+            user=self.user, organization=self.org,
+            role=OrganizationMembership.Role.OWNER,
+        )
+        for i in range(3):
+            WebhookLog.objects.create(
+                source=WebhookLog.Source.WHATSAPP,
+                organization=self.org,
+                headers={"X-Test": str(i)},
+                body={"entry": [i]},
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_is_limit_offset_paginated_without_payload(self):
+        response = self.client.get("/api/channels/webhook-logs/", {"limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertNotIn("body", response.data["results"][0])
+        self.assertNotIn("headers", response.data["results"][0])
+
+    def test_retrieve_includes_payload(self):
+        log = WebhookLog.objects.filter(organization=self.org).first()
+        response = self.client.get(f"/api/channels/webhook-logs/{log.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["body"], log.body)
+
+
+class ManagerDashboardListTest(TestCase):
+    """Override / manager-query lists are org-scoped and free of N+1 lookups."""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.org = Organization.objects.create(name="Dash Org")
+        self.other_org = Organization.objects.create(name="Other Dash Org")
+        self.user = User.objects.create_user(
+            email="dash@test.test", username="dash", password="pw",
+        )
+        OrganizationMembership.objects.create(
+            user=self.user, organization=self.org,
+            role=OrganizationMembership.Role.OWNER,
+        )
+        expires = timezone.now() + timedelta(hours=2)
+        for org in (self.org, self.other_org):
+            for i in range(3):
+                manager = ManagerNumber.objects.create(
+                    organization=org, phone_number=f"98765432{i}0", name=f"Mgr {i}",
+                )
+                TemporaryOverride.objects.create(
+                    organization=org, created_by_manager=manager,
+                    original_message="closed", processed_content="closed",
+                    expires_at=expires,
+                )
+                conversation = Conversation.objects.create(
+                    organization=org, channel=Channel.WHATSAPP,
+                    customer_name=f"Cust {i}",
+                )
+                ManagerQuery.objects.create(
+                    organization=org, conversation=conversation, manager=manager,
+                    customer_query="table?", query_summary="table?",
+                    expires_at=expires,
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_override_list_scoped_with_manager_name(self):
+        with self.assertNumQueries(2) as ctx:  # count + page
+            response = self.client.get("/api/channels/temporary-overrides/")
+        # Only the manager's name is read from the joined row
+        self.assertNotIn("phone_number", ctx.captured_queries[-1]["sql"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertTrue(all(r["created_by_manager_name"] for r in response.data["results"]))
+
+    def test_manager_query_list_scoped_with_names(self):
+        with self.assertNumQueries(1) as ctx:  # cursor pagination: no COUNT
+            response = self.client.get("/api/channels/manager-queries/")
+        self.assertNotIn("customer_metadata", ctx.captured_queries[0]["sql"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["next"])
+        names = {r["customer_name"] for r in response.data["results"]}
+        self.assertEqual(names, {"Cust 0", "Cust 1", "Cust 2"})
+
+    def test_manager_query_pending(self):
+        ManagerQuery.objects.filter(conversation__customer_name="Cust 0").update(
+            status=ManagerQuery.Status.ANSWERED,
+        )
+        response = self.client.get("/api/channels/manager-queries/pending/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({r["customer_name"] for r in response.data}, {"Cust 1", "Cust 2"})
+
+    def test_create_manager_number_requires_membership(self):
+        for org in (self.org, self.other_org):
+            WhatsAppConfig.objects.create(organization=org, phone_number_id=f"PN{org.name}", is_active=True)
+        payload = {"phone_number": "+15559990000", "name": "New Mgr"}
+
+        response = self.client.post(
+            "/api/channels/manager-numbers/", {**payload, "organization": str(self.other_org.id)}, format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(str(response.data["detail"]), "Not a member of this organization")
+
+        response = self.client.post(
+            "/api/channels/manager-numbers/", {**payload, "organization": str(self.org.id)}, format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["phone_number"], "15559990000")
+
+
+class WhatsAppBatchWebhookTest(TestCase):
+    """A webhook carrying several messages is ingested as one batch."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name="Batch Org")
+        self.config = WhatsAppConfig.objects.create(
+            organization=self.org,
+            phone_number_id="PNID",
+            access_token="token",
+            is_active=True,
+        )
+
+    def _payload(self, messages, contacts):
+        return {"entry": [{"changes": [{"value": {
+            "metadata": {"phone_number_id": "PNID"},
+            "contacts": contacts,
+            "messages": messages,
+        }}]}]}
+
+    @patch("apps.channels.tasks.process_whatsapp_ai_message_task.delay")
+    def test_messages_grouped_per_sender(self, mock_delay):
+        existing = Conversation.objects.create(
+            organization=self.org,
+            channel=Channel.WHATSAPP,
+            customer_phone="15550001111",
+        )
+        payload = self._payload(
+            messages=[
+                {"from": "15550001111", "id": "wamid.1", "type": "text", "text": {"body": "hi"}},
+                {"from": "15550002222", "id": "wamid.2", "type": "text", "text": {"body": "hello"}},
+                {"from": "15550001111", "id": "wamid.3", "type": "image"},
+            ],
+            contacts=[{"wa_id": "15550002222", "profile": {"name": "New Person"}}],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(WhatsAppService(self.config).process_webhook(payload))
+
+        self.assertEqual(
+            list(existing.messages.values_list("channel_message_id", flat=True)),
+            ["wamid.1", "wamid.3"],
+        )
+        created = Conversation.objects.get(customer_phone="15550002222")
+        self.assertEqual(created.customer_name, "New Person")
+        self.assertEqual(created.messages.get().content, "hello")
+        existing.refresh_from_db()
+        self.assertIsNotNone(existing.last_message_at)
+        # AI replies are queued, one task per customer message
+        self.assertEqual(mock_delay.call_count, 3)
+        self.assertEqual(mock_delay.call_args_list[0].args, (str(self.config.id), str(existing.messages.first().id)))
+
+    @patch("apps.channels.tasks.process_whatsapp_ai_message_task.delay")
+    def test_redelivered_messages_skipped(self, mock_delay):
+        message = {"from": "15550003333", "id": "wamid.r", "type": "text", "text": {"body": "hi"}}
+        # Repeated within the delivery, then the whole delivery again
+        payload = self._payload(messages=[message, message], contacts=[])
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertTrue(WhatsAppService(self.config).process_webhook(payload))
+        self.assertEqual(Message.objects.filter(channel_message_id="wamid.r").count(), 1)
+        self.assertEqual(mock_delay.call_count, 1)
+        self.assertEqual(Conversation.objects.get(customer_phone="15550003333").unread_customer_count, 1)
+
+    @patch("apps.channels.tasks.process_whatsapp_ai_message_task.delay")
+    def test_conflicting_rows_not_counted_or_queued(self, mock_delay):
+        conversation = Conversation.objects.create(
+            organization=self.org, channel=Channel.WHATSAPP, customer_phone="15550005555",
+        )
+        # Stored by a concurrent delivery of the same webhook
+        Message.objects.create(
+            conversation=conversation, sender=MessageSender.CUSTOMER, content="hi", channel_message_id="wamid.c",
+        )
+        payload = self._payload(messages=[
+            {"from": "15550005555", "id": "wamid.c", "type": "text", "text": {"body": "hi"}},
+            {"from": "15550005555", "id": "wamid.d", "type": "text", "text": {"body": "there"}},
+        ], contacts=[])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(WhatsAppService(self.config).process_webhook(payload))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_customer_count, 2)
+        self.assertEqual(conversation.last_message_content, "there")
+        self.assertEqual(mock_delay.call_count, 1)
+        queued = Message.objects.get(pk=mock_delay.call_args.args[1])
+        self.assertEqual(queued.channel_message_id, "wamid.d")
+
+    def test_status_updates_written_in_bulk(self):
+        conversation = Conversation.objects.create(
+            organization=self.org, channel=Channel.WHATSAPP, customer_phone="15550004444",
+        )
+        first = Message.objects.create(
+            conversation=conversation, sender=MessageSender.AI, content="a",
+            channel_message_id="wamid.a", ai_metadata={"intent": "greeting"},
+        )
+        second = Message.objects.create(
+            conversation=conversation, sender=MessageSender.AI, content="b",
+            channel_message_id="wamid.b",
+        )
+        payload = {"entry": [{"changes": [{"value": {"statuses": [
+            {"id": "wamid.a", "status": "delivered"},
+            {"id": "wamid.b", "status": "read"},
+            {"id": "wamid.a", "status": "read"},
+            {"id": "wamid.unknown", "status": "sent"},
+        ]}}]}]}
+        with self.assertNumQueries(2):  # one UPDATE per distinct final status
+            self.assertTrue(WhatsAppService(self.config).process_webhook(payload))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.ai_metadata, {"intent": "greeting", "delivery_status": "read"})
+        self.assertEqual(second.ai_metadata, {"delivery_status": "read"})
+
+    def test_malformed_webhook_rejected(self):
+        service = WhatsAppService(self.config)
+        self.assertFalse(service.process_webhook({}))
+        self.assertFalse(service.process_webhook({"entry": []}))
+        self.assertFalse(service.process_webhook({"entry": [{"changes": [{}]}]}))
+        self.assertTrue(service.process_webhook({"entry": [{"changes": [{"value": {}}]}]}))
+
+    @patch.object(WhatsAppService, "_process_with_ai")
+    def test_ai_task_skips_human_handoff(self, mock_ai):
+        from apps.channels.tasks import process_whatsapp_ai_message_task
+        from apps.messaging.models import ConversationState
+
+        conversation = Conversation.objects.create(
+            organization=self.org, channel=Channel.WHATSAPP, customer_phone="15550003333",
+        )
+        message = Message.objects.create(conversation=conversation, content="hi")
+        process_whatsapp_ai_message_task(str(self.config.id), str(message.id))
+        self.assertEqual(mock_ai.call_count, 1)
+
+        conversation.state = ConversationState.HUMAN_HANDOFF
+        conversation.save()
+        process_whatsapp_ai_message_task(str(self.config.id), str(message.id))
+        self.assertEqual(mock_ai.call_count, 1)
+
+    def test_one_open_conversation_per_phone(self):
+        from django.db import IntegrityError, transaction
+
+        Conversation.objects.create(
+            organization=self.org, channel=Channel.WHATSAPP, customer_phone="15550005555",
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Conversation.objects.create(
+                organization=self.org, channel=Channel.WHATSAPP, customer_phone="15550005555",
+            )
+        # Website chats without a phone are not constrained
+        Conversation.objects.create(organization=self.org, channel=Channel.WEBSITE)
+        Conversation.objects.create(organization=self.org, channel=Channel.WEBSITE)
+
+    def test_get_or_create_conversations_reuses_concurrent_row(self):
+        service = WhatsAppService(self.config)
+        created = service._get_or_create_conversations({"15550006666": "Racer"})["15550006666"]
+        again = service._get_or_create_conversations({"15550006666": "Racer"})["15550006666"]
+        self.assertEqual(created.pk, again.pk)
+        self.assertEqual(
+            Conversation.objects.filter(customer_phone="15550006666").count(), 1
+        )
+
+    @patch("apps.channels.tasks.log_webhook_task.delay")
+    def test_webhook_log_written_off_request_path(self, mock_delay):
+        payload = self._payload(messages=[], contacts=[])
+        payload["entry"][0]["changes"][0]["value"]["metadata"]["phone_number_id"] = "UNKNOWN"
+        response = self.client.post("/api/webhooks/whatsapp/", payload, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(WebhookLog.objects.exists())
+        kwargs = mock_delay.call_args.kwargs
+        self.assertEqual(kwargs["source"], WebhookLog.Source.WHATSAPP)
+        self.assertIsNone(kwargs["organization_id"])
+        self.assertIn("UNKNOWN", kwargs["error_message"])
+
+    @patch("apps.channels.tasks.log_webhook_task.delay", side_effect=ConnectionError)
+    @patch.object(WhatsAppService, "process_webhook", return_value=True)
+    def test_webhook_log_saved_inline_when_queue_down(self, mock_process, mock_delay):
+        response = self.client.post(
+            "/api/webhooks/whatsapp/", self._payload(messages=[], contacts=[]), content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        log = WebhookLog.objects.get()
+        self.assertEqual(log.organization, self.org)
+        self.assertTrue(log.is_processed)
+
+
+class WhatsAppOutboundTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="WA Outbound Org")
+        self.config = WhatsAppConfig.objects.create(
+            organization=self.org,
+            phone_number_id="PNID",
+            access_token="token",
+            is_active=True,
+        )
+
+    def test_http_session_is_shared(self):
+        self.assertIs(WhatsAppService._http(), WhatsAppService._http())
+
+    @patch.object(WhatsAppService, "_http")
+    def test_send_message_uses_pooled_session(self, mock_http):
+        response = mock_http.return_value.post.return_value
+        response.content = b'{"messages": [{"id": "wamid.out"}]}'
+
+        message_id = WhatsAppService(self.config).send_message("15550001111", "hi")
+        self.assertEqual(message_id, "wamid.out")
+        args, kwargs = mock_http.return_value.post.call_args
+        self.assertEqual(args[0], "https://graph.facebook.com/v18.0/PNID/messages")
+        self.assertEqual(json.loads(kwargs["data"])["text"]["body"], "hi")
+        self.assertEqual(kwargs["headers"]["Authorization"], "Bearer token")
+
+    @patch.object(WhatsAppService, "_http")
+    def test_send_error_body_is_capped(self, mock_http):
+        import requests
+
+        error_response = MagicMock(content=b"<html>" + b"x" * 100_000)
+        mock_http.return_value.post.return_value.raise_for_status.side_effect = (
+            requests.exceptions.HTTPError("429", response=error_response)
+        )
+        with self.assertLogs("apps.channels.whatsapp_service", level="ERROR") as logs:
+            self.assertIsNone(WhatsAppService(self.config).send_message("15550001111", "hi"))
+        self.assertTrue(all(len(line) < 5000 for line in logs.output))
+
+    def test_error_body_parses_json(self):
+        response = MagicMock(content=b'{"error": {"code": 131047}}')
+        self.assertEqual(WhatsAppService._error_body(response), {"error": {"code": 131047}})
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class WhatsAppConfigCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.org = Organization.objects.create(name="WA Cache Org")
+        self.config = WhatsAppConfig.objects.create(
+            organization=self.org, phone_number_id="PNID", is_active=True,
+        )
+
+    def test_lookup_cached_until_config_saved(self):
+        self.assertEqual(WhatsAppService.get_for_organization(self.org).config, self.config)
+        with self.assertNumQueries(0):
+            WhatsAppService.get_for_organization(self.org)
+
+        self.config.is_active = False
+        self.config.save()
+        self.assertIsNone(WhatsAppService.get_for_organization(self.org))
+
+    def test_lookup_falls_back_when_cache_unavailable(self):
+        with patch("apps.channels.whatsapp_service.cache.get", side_effect=ConnectionError):
+            service = WhatsAppService.get_for_organization(self.org)
+        self.assertEqual(service.config, self.config)
+
+    def test_database_errors_not_retried_as_cache_errors(self):
+        with patch("apps.channels.whatsapp_service.WhatsAppConfig.objects.filter", side_effect=DatabaseError) as query:
+            with self.assertRaises(DatabaseError):
+                get_active_config(self.org.id)
+        self.assertEqual(query.call_count, 1)
+
+    def test_organization_not_cached_with_config(self):
+        get_active_config(self.org.id)
+        Organization.objects.filter(pk=self.org.pk).update(name="Renamed")
+        with self.assertNumQueries(1):  # the organization, fresh
+            self.assertEqual(get_active_config(self.org.id).organization.name, "Renamed")
+        with self.assertNumQueries(0):
+            service = WhatsAppService.get_for_organization(self.org)
+        self.assertIs(service.organization, self.org)
+
+
+@override_settings(META_APP_SECRET="appsecret")
+class WhatsAppSignatureTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="WA Sig Org")
+        self.config = WhatsAppConfig.objects.create(
+            organization=self.org, phone_number_id="PNID", is_active=True,
+        )
+        self.service = WhatsAppService(self.config)
+        self.payload = b'{"entry": []}'
+
+    def _sign(self, secret="appsecret"):
+        return "sha256=" + hmac.new(secret.encode(), self.payload, hashlib.sha256).hexdigest()
+
+    def test_valid_signature_passes(self):
+        self.assertTrue(self.service.verify_webhook_signature(self.payload, self._sign()))
+
+    def test_wrong_secret_fails(self):
+        self.assertFalse(self.service.verify_webhook_signature(self.payload, self._sign("other")))
+
+    def test_malformed_signature_fails(self):
+        self.assertFalse(self.service.verify_webhook_signature(self.payload, "sha256=zz-not-hex"))
+        self.assertFalse(self.service.verify_webhook_signature(self.payload, self._sign()[7:]))
+        self.assertFalse(self.service.verify_webhook_signature(self.payload, "sha256=" + "z" * 64))
+
+    def test_malformed_signature_skips_hmac(self):
+        with patch("apps.channels.whatsapp_service.hmac.digest") as mock_hmac:
+            self.assertFalse(self.service.verify_webhook_signature(self.payload, "sha256=abc"))
+        mock_hmac.assert_not_called()
@@ -19,6 +19,7 @@ from typing import Optional, Dict, Any
 
 import requests
 from django.conf import settings
+from django.db import IntegrityError, transaction
 
 from apps.messaging.models import (
     Conversation, Message, Channel, ConversationState, MessageSender
@@ -127,21 +128,29 @@ class TwilioService:
 
             conversation = self._get_or_create_conversation(from_phone, sender_name)
 
-            message = Message.objects.create(
-                conversation=conversation,
-                sender=MessageSender.CUSTOMER,
-                content=body,
-                channel_message_id=wa_message_id,
-                ai_metadata={
-                    'provider': 'twilio',
-                    'sender_phone': from_phone,
-                    'num_media': num_media,
-                }
-            )
+            try:
+                # Savepoint, so a duplicate doesn't poison an outer transaction
+                with transaction.atomic():
+                    message = Message.objects.create(
+                        conversation=conversation,
+                        sender=MessageSender.CUSTOMER,
+                        content=body,
+                        channel_message_id=wa_message_id,
+                        ai_metadata={
+                            'provider': 'twilio',
+                            'sender_phone': from_phone,
+                            'num_media': num_media,
+                        }
+                    )
+            except IntegrityError:
+                # Twilio retried a webhook whose message is already stored
+                # (msg_channel_msgid_uniq); it was answered the first time
+                logger.info("Duplicate Twilio message %s ignored", wa_message_id)
+                return True
 
             if conversation.state not in [ConversationState.HUMAN_HANDOFF]:
                 conversation.state = ConversationState.AI_HANDLING
-                conversation.save()
+                conversation.save(update_fields=['state', 'updated_at'])
                 self._process_with_ai(conversation, message)
 
             logger.info("Twilio message received from %s: %s", from_phone, body[:50])
@@ -178,7 +187,7 @@ class TwilioService:
             )
 
     def _get_or_create_conversation(self, phone: str, name: str) -> Conversation:
-        conversation = Conversation.objects.filter(
+        conversation, _ = Conversation.objects.get_or_create(
             organization=self.organization,
             channel=Channel.WHATSAPP,  # Twilio is still the WhatsApp channel
             customer_phone=phone,
@@ -187,18 +196,13 @@ class TwilioService:
                 ConversationState.AI_HANDLING,
                 ConversationState.AWAITING_USER,
                 ConversationState.HUMAN_HANDOFF,
-            ]
-        ).first()
-
-        if not conversation:
-            conversation = Conversation.objects.create(
-                organization=self.organization,
-                channel=Channel.WHATSAPP,
-                customer_name=name,
-                customer_phone=phone,
-                state=ConversationState.NEW,
-                customer_metadata={'provider': 'twilio'},
-            )
+            ],
+            defaults={
+                'customer_name': name,
+                'state': ConversationState.NEW,
+                'customer_metadata': {'provider': 'twilio'},
+            },
+        )
         return conversation
 
     def _process_with_ai(self, conversation: Conversation, message: Message):
@@ -237,15 +241,15 @@ class TwilioService:
                 )
                 if alert:
                     conversation.state = ConversationState.HUMAN_HANDOFF
-                    conversation.save()
+                    conversation.save(update_fields=['state', 'updated_at'])
 
             sent_id = self.send_message(conversation.customer_phone, response['content'])
             if sent_id:
                 ai_message.channel_message_id = sent_id
-                ai_message.save()
+                ai_message.save(update_fields=['channel_message_id'])
 
             conversation.state = ConversationState.AWAITING_USER
-            conversation.save()
+            conversation.save(update_fields=['state', 'updated_at'])
         except Exception as e:
             logger.exception("Error processing Twilio message with AI: %s", e)
 
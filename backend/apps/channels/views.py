@@ -5,17 +5,21 @@ Includes Manager Number management endpoints.
 """
 import json
 import logging
+from django.db.models import Exists, OuterRef
 from django.http import HttpResponse, JsonResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
 from rest_framework.response import Response
 
 from apps.accounts.models import Organization, OrganizationMembership
+from apps.common.mixins import UserOrgIdsMixin
+from apps.common.utils import json_loads
 from .models import WhatsAppConfig, InstagramConfig, TwilioConfig, WebhookLog, ManagerNumber, TemporaryOverride, ManagerQuery
-from .whatsapp_service import WhatsAppService
+from .whatsapp_service import WhatsAppService, get_active_config
 from .instagram_service import InstagramService
 from .twilio_service import TwilioService
 from .serializers import (
@@ -23,6 +27,7 @@ from .serializers import (
     InstagramConfigSerializer,
     TwilioConfigSerializer,
     WebhookLogSerializer,
+    WebhookLogListSerializer,
     ManagerNumberSerializer,
     ManagerNumberCreateSerializer,
     TemporaryOverrideSerializer,
@@ -31,6 +36,27 @@ from .serializers import (
 
 logger = logging.getLogger(__name__)
 
+# Webhook acknowledgement body. Kept as bytes so HttpResponse doesn't
+# re-encode it on every delivery (Meta/Twilio only look at the status code).
+_OK_RESPONSE_BODY = b'OK'
+
+
+def _save_webhook_log(webhook_log):
+    """Queue the webhook log INSERT off the request path; save inline if it can't be queued."""
+    try:
+        from .tasks import log_webhook_task
+        log_webhook_task.delay(
+            source=webhook_log.source,
+            organization_id=str(webhook_log.organization_id) if webhook_log.organization_id else None,
+            headers=webhook_log.headers,
+            body=webhook_log.body,
+            is_processed=webhook_log.is_processed,
+            error_message=webhook_log.error_message,
+        )
+    except Exception:
+        logger.warning("Could not queue webhook log; saving inline")
+        webhook_log.save()
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class WhatsAppWebhookView(View):
@@ -53,7 +79,7 @@ class WhatsAppWebhookView(View):
             try:
                 config = WhatsAppConfig.objects.get(verify_token=token)
                 config.is_verified = True
-                config.save()
+                config.save(update_fields=['is_verified', 'updated_at'])
                 logger.info(f"WhatsApp webhook verified for {config.organization.name}")
                 return HttpResponse(challenge, content_type='text/plain')
             except WhatsAppConfig.DoesNotExist:
@@ -72,7 +98,7 @@ class WhatsAppWebhookView(View):
             signature = request.headers.get('X-Hub-Signature-256', '')
             
             # Parse body
-            body = json.loads(request.body)
+            body = json_loads(request.body)
             
             # Find the organization from phone_number_id FIRST
             phone_number_id = None
@@ -94,8 +120,9 @@ class WhatsAppWebhookView(View):
                 logger.error(f"❌ CRITICAL: No active WhatsApp config for phone_number_id: {phone_number_id}")
                 logger.error(f"Check that WhatsApp config exists and is_active=True in database")
             
-            # Log the raw webhook with organization context
-            webhook_log = WebhookLog.objects.create(
+            # Log the raw webhook with organization context; the row is
+            # written once with its outcome when the request finishes
+            webhook_log = WebhookLog(
                 source=WebhookLog.Source.WHATSAPP,
                 organization=config.organization if config else None,
                 headers=dict(request.headers),
@@ -114,7 +141,6 @@ class WhatsAppWebhookView(View):
                             error_msg = "WhatsApp webhook signature verification failed"
                             logger.error(f"❌ {error_msg}")
                             webhook_log.error_message = error_msg
-                            webhook_log.save()
                             return HttpResponse('Invalid signature', status=401)
                     
                     # Process the webhook
@@ -122,29 +148,24 @@ class WhatsAppWebhookView(View):
                     
                     if success:
                         webhook_log.is_processed = True
-                        webhook_log.save()
                         logger.info(f"✅ WhatsApp webhook processed successfully for {config.organization.name}")
                     else:
                         error_msg = "Webhook processing returned False"
                         logger.error(f"❌ {error_msg}")
                         webhook_log.error_message = error_msg
-                        webhook_log.save()
                     
                 except Exception as e:
                     error_msg = f"Error in WhatsApp service processing: {str(e)}"
                     logger.exception(f"❌ {error_msg}")
                     if webhook_log:
                         webhook_log.error_message = error_msg
-                        webhook_log.save()
             else:
                 error_msg = f"No active WhatsApp config found for phone_number_id: {phone_number_id}"
                 logger.error(f"❌ {error_msg}")
-                if webhook_log:
-                    webhook_log.error_message = error_msg
-                    webhook_log.save()
+                webhook_log.error_message = error_msg
             
             # Always return 200 to acknowledge receipt
-            return HttpResponse('OK', status=200)
+            return HttpResponse(_OK_RESPONSE_BODY, status=200, content_type='text/plain')
             
         except json.JSONDecodeError as e:
             error_msg = f"Invalid JSON in WhatsApp webhook: {e}"
@@ -155,8 +176,10 @@ class WhatsAppWebhookView(View):
             logger.exception(f"❌ {error_msg}")
             if webhook_log:
                 webhook_log.error_message = error_msg
-                webhook_log.save()
-            return HttpResponse('OK', status=200)  # Still return 200 to prevent retries
+            return HttpResponse(_OK_RESPONSE_BODY, status=200, content_type='text/plain')  # Still return 200 to prevent retries
+        finally:
+            if webhook_log:
+                _save_webhook_log(webhook_log)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -176,7 +199,7 @@ class InstagramWebhookView(View):
             try:
                 config = InstagramConfig.objects.get(verify_token=token)
                 config.is_verified = True
-                config.save()
+                config.save(update_fields=['is_verified', 'updated_at'])
                 logger.info(f"Instagram webhook verified for {config.organization.name}")
                 return HttpResponse(challenge, content_type='text/plain')
             except InstagramConfig.DoesNotExist:
@@ -190,7 +213,7 @@ class InstagramWebhookView(View):
         webhook_log = None
         try:
             signature = request.headers.get('X-Hub-Signature-256', '')
-            body = json.loads(request.body)
+            body = json_loads(request.body)
             
             # Find the organization from entry ID FIRST
             # Instagram sends either page_id or instagram_business_id in entry.id
@@ -236,7 +259,7 @@ class InstagramWebhookView(View):
                             error_msg = "Instagram webhook signature verification failed"
                             logger.error(f"❌ {error_msg}")
                             webhook_log.error_message = error_msg
-                            webhook_log.save()
+                            webhook_log.save(update_fields=['error_message'])
                             return HttpResponse('Invalid signature', status=401)
                     
                     # Process the webhook
@@ -244,30 +267,30 @@ class InstagramWebhookView(View):
                     
                     if success:
                         webhook_log.is_processed = True
-                        webhook_log.save()
+                        webhook_log.save(update_fields=['is_processed'])
                         logger.info(f"✅ Instagram webhook processed successfully for {config.organization.name}")
                     else:
                         error_msg = "Webhook processing returned False"
                         logger.error(f"❌ {error_msg}")
                         webhook_log.error_message = error_msg
-                        webhook_log.save()
+                        webhook_log.save(update_fields=['error_message'])
                         
                 except Exception as e:
                     error_msg = f"Error in Instagram service processing: {str(e)}"
                     logger.exception(f"❌ {error_msg}")
                     if webhook_log:
                         webhook_log.error_message = error_msg
-                        webhook_log.save()
+                        webhook_log.save(update_fields=['error_message'])
             else:
                 error_msg = f"No active Instagram config found for entry_id: {entry_id}"
                 logger.error(f"❌ {error_msg}")
                 logger.error(f"   Available configs: {list(InstagramConfig.objects.filter(is_active=True).values_list('instagram_business_id', 'page_id'))}")
                 if webhook_log:
                     webhook_log.error_message = error_msg
-                    webhook_log.save()
+                    webhook_log.save(update_fields=['error_message'])
             
             # Always return 200 to acknowledge receipt
-            return HttpResponse('OK', status=200)
+            return HttpResponse(_OK_RESPONSE_BODY, status=200, content_type='text/plain')
             
         except json.JSONDecodeError as e:
             error_msg = f"Invalid JSON in Instagram webhook: {e}"
@@ -278,8 +301,8 @@ class InstagramWebhookView(View):
             logger.exception(f"❌ {error_msg}")
             if webhook_log:
                 webhook_log.error_message = error_msg
-                webhook_log.save()
-            return HttpResponse('OK', status=200)  # Still return 200 to prevent retries
+                webhook_log.save(update_fields=['error_message'])
+            return HttpResponse(_OK_RESPONSE_BODY, status=200, content_type='text/plain')  # Still return 200 to prevent retries
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -336,9 +359,9 @@ class TwilioWebhookView(View):
                 msg = f"No active TwilioConfig for To={twilio_number}"
                 logger.error(f"❌ {msg}")
                 webhook_log.error_message = msg
-                webhook_log.save()
+                webhook_log.save(update_fields=['error_message'])
                 # Still 200 so Twilio doesn't retry forever
-                return HttpResponse('OK', status=200)
+                return HttpResponse(_OK_RESPONSE_BODY, status=200, content_type='text/plain')
 
             service = TwilioService(config)
 
@@ -353,14 +376,14 @@ class TwilioWebhookView(View):
                     msg = "Twilio signature verification failed"
                     logger.error(msg)
                     webhook_log.error_message = msg
-                    webhook_log.save()
+                    webhook_log.save(update_fields=['error_message'])
                     return HttpResponse('Invalid signature', status=401)
 
             success = service.process_webhook(params)
             webhook_log.is_processed = success
             if not success:
                 webhook_log.error_message = "process_webhook returned False"
-            webhook_log.save()
+            webhook_log.save(update_fields=['is_processed', 'error_message'])
 
             # Twilio doesn't require TwiML response; empty 200 is fine
             return HttpResponse('<Response/>', content_type='application/xml', status=200)
@@ -369,28 +392,22 @@ class TwilioWebhookView(View):
             logger.exception(f"❌ Unexpected error in Twilio webhook: {e}")
             if webhook_log:
                 webhook_log.error_message = str(e)
-                webhook_log.save()
-            return HttpResponse('OK', status=200)
+                webhook_log.save(update_fields=['error_message'])
+            return HttpResponse(_OK_RESPONSE_BODY, status=200, content_type='text/plain')
 
 
-class TwilioConfigViewSet(viewsets.ModelViewSet):
+class TwilioConfigViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """ViewSet for managing Twilio WhatsApp configuration."""
     serializer_class = TwilioConfigSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
+        org_ids = self._user_org_ids()
         return TwilioConfig.objects.filter(organization_id__in=org_ids)
 
     def perform_create(self, serializer):
         org_id = self.request.data.get('organization')
-        if not OrganizationMembership.objects.filter(
-            user=self.request.user,
-            organization_id=org_id
-        ).exists():
+        if not self._get_membership(org_id):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Not a member of this organization")
 
@@ -508,7 +525,7 @@ class TwilioConfigViewSet(viewsets.ModelViewSet):
         return Response(health_data)
 
 
-class WhatsAppConfigViewSet(viewsets.ModelViewSet):
+class WhatsAppConfigViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing WhatsApp configuration.
     """
@@ -516,18 +533,12 @@ class WhatsAppConfigViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
+        org_ids = self._user_org_ids()
         return WhatsAppConfig.objects.filter(organization_id__in=org_ids)
     
     def perform_create(self, serializer):
         org_id = self.request.data.get('organization')
-        if not OrganizationMembership.objects.filter(
-            user=self.request.user,
-            organization_id=org_id
-        ).exists():
+        if not self._get_membership(org_id):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Not a member of this organization")
         
@@ -692,7 +703,7 @@ class WhatsAppConfigViewSet(viewsets.ModelViewSet):
         return Response(health_data)
 
 
-class InstagramConfigViewSet(viewsets.ModelViewSet):
+class InstagramConfigViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Instagram configuration.
     """
@@ -700,18 +711,12 @@ class InstagramConfigViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
+        org_ids = self._user_org_ids()
         return InstagramConfig.objects.filter(organization_id__in=org_ids)
     
     def perform_create(self, serializer):
         org_id = self.request.data.get('organization')
-        if not OrganizationMembership.objects.filter(
-            user=self.request.user,
-            organization_id=org_id
-        ).exists():
+        if not self._get_membership(org_id):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Not a member of this organization")
         
@@ -888,18 +893,28 @@ class InstagramConfigViewSet(viewsets.ModelViewSet):
         return Response(health_data)
 
 
-class WebhookLogViewSet(viewsets.ReadOnlyModelViewSet):
+class WebhookLogPagination(LimitOffsetPagination):
+    default_limit = 20
+    max_limit = 100
+
+
+class WebhookLogViewSet(UserOrgIdsMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing webhook logs (debugging).
+    The list is paginated and omits the raw headers/body payload;
+    fetch a single log to see it.
     """
     serializer_class = WebhookLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = WebhookLogPagination
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return WebhookLogListSerializer
+        return WebhookLogSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
+        org_ids = self._user_org_ids()
         
         queryset = WebhookLog.objects.filter(organization_id__in=org_ids)
         
@@ -907,10 +922,14 @@ class WebhookLogViewSet(viewsets.ReadOnlyModelViewSet):
         if source:
             queryset = queryset.filter(source=source)
         
-        return queryset[:100]  # Limit to last 100 logs
+        if self.action == 'list':
+            # Raw payload columns are often 10-50x the rest of the row
+            queryset = queryset.defer('headers', 'body')
+        
+        return queryset
 
 
-class ManagerNumberViewSet(viewsets.ModelViewSet):
+class ManagerNumberViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Manager WhatsApp Numbers.
     Managers can receive commands via WhatsApp to control the chatbot.
@@ -924,10 +943,11 @@ class ManagerNumberViewSet(viewsets.ModelViewSet):
         return ManagerNumberSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
+        # OPTIONS only needs serializer metadata, never rows
+        if self.request.method == 'OPTIONS':
+            return ManagerNumber.objects.none()
+        
+        org_ids = self._user_org_ids()
         
         queryset = ManagerNumber.objects.filter(organization_id__in=org_ids)
         
@@ -958,19 +978,17 @@ class ManagerNumberViewSet(viewsets.ModelViewSet):
         """Create manager number with permission check."""
         org_id = self.request.data.get('organization')
         
-        # Check membership
-        membership = OrganizationMembership.objects.filter(
+        # Only owners and managers can add manager numbers; the common case is
+        # a single EXISTS, and only a refusal looks up why
+        memberships = OrganizationMembership.objects.filter(
             user=self.request.user,
             organization_id=org_id
-        ).first()
-        
-        if not membership:
-            from rest_framework.exceptions import PermissionDenied
-            raise PermissionDenied("Not a member of this organization")
-        
-        # Only owners and managers can add manager numbers
-        if membership.role not in ['owner', 'manager']:
+        )
+        allowed_roles = [OrganizationMembership.Role.OWNER, OrganizationMembership.Role.MANAGER]
+        if not memberships.filter(role__in=allowed_roles).exists():
             from rest_framework.exceptions import PermissionDenied
+            if not memberships.exists():
+                raise PermissionDenied("Not a member of this organization")
             raise PermissionDenied("Only owners and managers can add manager numbers")
         
         serializer.save()
@@ -989,12 +1007,8 @@ class ManagerNumberViewSet(viewsets.ModelViewSet):
         """
         manager = self.get_object()
         
-        try:
-            whatsapp_config = WhatsAppConfig.objects.get(
-                organization=manager.organization,
-                is_active=True
-            )
-        except WhatsAppConfig.DoesNotExist:
+        whatsapp_config = get_active_config(manager.organization_id)
+        if whatsapp_config is None:
             return Response({
                 'success': False,
                 'error': 'WhatsApp is not configured or not active for this organization'
@@ -1041,24 +1055,30 @@ class ManagerNumberViewSet(viewsets.ModelViewSet):
                 'error': 'organization parameter required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        try:
-            config = WhatsAppConfig.objects.get(
-                organization_id=org_id,
-                is_active=True
-            )
-            return Response({
-                'ready': True,
-                'whatsapp_verified': config.is_verified,
-                'message': 'WhatsApp is configured. You can add manager numbers.'
-            })
-        except WhatsAppConfig.DoesNotExist:
+        config = get_active_config(org_id)
+        if config is None:
             return Response({
                 'ready': False,
                 'error': 'Please configure and activate WhatsApp first before adding manager numbers.'
             })
+        return Response({
+            'ready': True,
+            'whatsapp_verified': config.is_verified,
+            'message': 'WhatsApp is configured. You can add manager numbers.'
+        })
+
 
+class MembershipExistsMixin:
+    """Scopes org-owned rows to the user via EXISTS instead of an org-id list."""
 
-class TemporaryOverrideViewSet(viewsets.ModelViewSet):
+    def _membership_subquery(self):
+        return OrganizationMembership.objects.filter(
+            user=self.request.user,
+            organization_id=OuterRef('organization_id')
+        )
+
+
+class TemporaryOverrideViewSet(MembershipExistsMixin, UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and managing Temporary Overrides.
     Overrides are typically created by managers via WhatsApp,
@@ -1066,14 +1086,21 @@ class TemporaryOverrideViewSet(viewsets.ModelViewSet):
     """
     serializer_class = TemporaryOverrideSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Columns the list serializer reads; of the manager row only its name
+    list_only_fields = (
+        'id', 'organization', 'override_type', 'priority',
+        'original_message', 'processed_content', 'trigger_keywords',
+        'created_by_manager', 'created_by_manager__name',
+        'starts_at', 'expires_at', 'auto_expire_on_next_open',
+        'is_active', 'created_at', 'updated_at',
+    )
     
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
-        
-        queryset = TemporaryOverride.objects.filter(organization_id__in=org_ids)
+        # Membership check as a correlated EXISTS, plus the manager row the
+        # serializer reads (created_by_manager_name), in one statement
+        queryset = TemporaryOverride.objects.filter(
+            Exists(self._membership_subquery())
+        ).select_related('created_by_manager')
         
         # Filter by organization
         org_id = self.request.query_params.get('organization')
@@ -1089,6 +1116,9 @@ class TemporaryOverrideViewSet(viewsets.ModelViewSet):
                 expires_at__gt=timezone.now()
             )
         
+        if self.action == 'list':
+            queryset = queryset.only(*self.list_only_fields)
+        
         return queryset.order_by('-priority', '-created_at')
     
     @action(detail=True, methods=['post'])
@@ -1096,7 +1126,7 @@ class TemporaryOverrideViewSet(viewsets.ModelViewSet):
         """Deactivate an override early."""
         override = self.get_object()
         override.is_active = False
-        override.save()
+        override.save(update_fields=['is_active', 'updated_at'])
         
         return Response({
             'success': True,
@@ -1113,10 +1143,7 @@ class TemporaryOverrideViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check permission
-        if not OrganizationMembership.objects.filter(
-            user=request.user,
-            organization_id=org_id
-        ).exists():
+        if not self._get_membership(org_id):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Not a member of this organization")
         
@@ -1134,21 +1161,35 @@ class TemporaryOverrideViewSet(viewsets.ModelViewSet):
         })
 
 
-class ManagerQueryViewSet(viewsets.ReadOnlyModelViewSet):
+class ManagerQueryPagination(CursorPagination):
+    ordering = '-created_at'
+    page_size = 50
+
+
+class ManagerQueryViewSet(MembershipExistsMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing Manager Queries (read-only from dashboard).
     Queries are created automatically when AI needs manager input.
+    The list is cursor-paginated, newest first.
     """
     serializer_class = ManagerQuerySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ManagerQueryPagination
+    # Columns the list serializer reads; of the joined manager and
+    # conversation rows only the display names
+    list_only_fields = (
+        'id', 'organization', 'conversation', 'conversation__customer_name',
+        'manager', 'manager__name', 'customer_query', 'query_summary',
+        'manager_response', 'response_received_at', 'status', 'expires_at',
+        'customer_response', 'customer_response_sent', 'created_at', 'updated_at',
+    )
     
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
-        
-        queryset = ManagerQuery.objects.filter(organization_id__in=org_ids)
+        # Membership check as a correlated EXISTS, plus the manager and
+        # conversation rows the serializer reads, in one statement
+        queryset = ManagerQuery.objects.filter(
+            Exists(self._membership_subquery())
+        ).select_related('manager', 'conversation')
         
         # Filter by organization
         org_id = self.request.query_params.get('organization')
@@ -1160,7 +1201,10 @@ class ManagerQueryViewSet(viewsets.ReadOnlyModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        return queryset.order_by('-created_at')[:100]
+        if self.action in ('list', 'pending'):
+            queryset = queryset.only(*self.list_only_fields)
+        
+        return queryset.order_by('-created_at')
     
     @action(detail=False, methods=['get'])
     def pending(self, request):
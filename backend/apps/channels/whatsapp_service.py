@@ -6,17 +6,83 @@ Includes manager message detection and processing.
 import hashlib
 import hmac
 import logging
+import zlib
+from collections import Counter
+from functools import lru_cache
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, Any
+from urllib3.util.retry import Retry
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
 from apps.messaging.models import Conversation, Message, Channel, ConversationState, MessageSender
 from apps.accounts.models import Organization
 from apps.ai_engine.services import AIService
+from apps.common.db import JSONSetKey
+from apps.common.utils import json_dumps, json_loads
 from .models import WhatsAppConfig, WebhookLog, ManagerNumber
 
 logger = logging.getLogger(__name__)
 
+SIGNATURE_PREFIX = 'sha256='
+# 'sha256=' followed by the 64 hex chars of a SHA-256 digest
+SIGNATURE_LENGTH = len(SIGNATURE_PREFIX) + 2 * hashlib.sha256().digest_size
+# Graph API error bodies are logged at most this long
+ERROR_BODY_LIMIT = 2048
+
+
+@lru_cache(maxsize=1)
+def _secret_bytes(app_secret: str) -> bytes:
+    """META_APP_SECRET encoded once, not on every webhook."""
+    return app_secret.encode('utf-8')
+
+
+CONFIG_CACHE_TTL = 300
+# The config row is cached as plain column values, not a pickled model (and
+# without its organization, whose edits would go unseen). The key carries the
+# column list, so entries written before a schema change are never read back.
+_CONFIG_FIELDS = tuple(field.attname for field in WhatsAppConfig._meta.concrete_fields)
+_CONFIG_FIELDS_VERSION = zlib.crc32(','.join(_CONFIG_FIELDS).encode())
+
+
+def config_cache_key(org_id) -> str:
+    return f'wa_cfg:{_CONFIG_FIELDS_VERSION}:{org_id}'
+
+
+def get_active_config(org_id, organization: Optional[Organization] = None) -> Optional[WhatsAppConfig]:
+    """
+    Active WhatsAppConfig for an organization, or None if not configured.
+    Cached for CONFIG_CACHE_TTL and invalidated on save/delete (see signals.py);
+    falls back to the database if the cache is unavailable. Pass the
+    organization if the caller has it loaded, to save config.organization's
+    query.
+    """
+    key = config_cache_key(org_id)
+    try:
+        values = cache.get(key)
+    except Exception:
+        logger.warning('WhatsApp config cache unavailable; reading org=%s from the database', org_id)
+        values = None
+    if values is None:
+        values = WhatsAppConfig.objects.filter(
+            organization_id=org_id,
+            is_active=True
+        ).values_list(*_CONFIG_FIELDS).first()
+        if values is None:
+            return None
+        try:
+            cache.set(key, values, CONFIG_CACHE_TTL)
+        except Exception:
+            pass
+    config = WhatsAppConfig.from_db(WhatsAppConfig.objects.db, _CONFIG_FIELDS, values)
+    if organization is not None:
+        config.organization = organization
+    return config
+
 
 class WhatsAppService:
     """
@@ -25,21 +91,50 @@ class WhatsAppService:
     
     GRAPH_API_URL = "https://graph.facebook.com/v18.0"
     
+    # Conversation states that a new inbound message continues
+    OPEN_STATES = [
+        ConversationState.NEW,
+        ConversationState.AI_HANDLING,
+        ConversationState.AWAITING_USER,
+        ConversationState.HUMAN_HANDOFF
+    ]
+    
+    # Shared keep-alive connection pool to graph.facebook.com, created lazily
+    # per process (Celery forks workers after import)
+    _session: Optional[requests.Session] = None
+    
+    @classmethod
+    def _http(cls) -> requests.Session:
+        """Pooled HTTP session so outbound sends reuse TCP/TLS connections."""
+        if cls._session is None:
+            session = requests.Session()
+            # Retries cover connection failures and 5xx on idempotent calls only;
+            # a POSTed message is never re-sent
+            adapter = HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=50,
+                max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+            )
+            session.mount('https://', adapter)
+            cls._session = session
+        return cls._session
+    
     def __init__(self, config: WhatsAppConfig):
         self.config = config
         self.organization = config.organization
+        # Endpoint and auth headers are fixed per config; build them once
+        # rather than on every outbound message
+        self._url = f"{self.GRAPH_API_URL}/{config.phone_number_id}/messages"
+        self._headers = {
+            "Authorization": f"Bearer {config.access_token}",
+            "Content-Type": "application/json"
+        }
     
     @classmethod
     def get_for_organization(cls, organization: Organization) -> Optional['WhatsAppService']:
         """Get WhatsApp service for an organization."""
-        try:
-            config = WhatsAppConfig.objects.get(
-                organization=organization,
-                is_active=True
-            )
-            return cls(config)
-        except WhatsAppConfig.DoesNotExist:
-            return None
+        config = get_active_config(organization.id, organization)
+        return cls(config) if config else None
     
     def verify_webhook_signature(self, payload: bytes, signature: str) -> bool:
         """
@@ -51,25 +146,32 @@ class WhatsAppService:
             logger.warning("META_APP_SECRET not configured - skipping signature verification")
             return True  # Skip verification in dev
         
-        # Calculate expected signature using raw bytes
-        expected_signature = hmac.new(
-            app_secret.encode('utf-8'),
-            payload,
-            hashlib.sha256
-        ).hexdigest()
+        # Reject malformed headers before spending a SHA-256 on the payload
+        received_digest = None
+        if len(signature) == SIGNATURE_LENGTH and signature.startswith(SIGNATURE_PREFIX):
+            try:
+                received_digest = bytes.fromhex(signature[len(SIGNATURE_PREFIX):])
+            except ValueError:
+                pass
+        if received_digest is None:
+            logger.error("❌ Webhook signature malformed: %s...", signature[:60])
+            return False
         
-        expected_full = f"sha256={expected_signature}"
-        is_valid = hmac.compare_digest(expected_full, signature)
+        # Calculate expected signature using raw bytes and compare the raw
+        # 32-byte digests (constant time) rather than hex strings. The
+        # one-shot hmac.digest runs in C without building an HMAC object.
+        expected_digest = hmac.digest(_secret_bytes(app_secret), payload, 'sha256')
+        is_valid = hmac.compare_digest(expected_digest, received_digest)
         
         if not is_valid:
-            logger.error(f"❌ Webhook signature verification FAILED")
-            logger.error(f"   Expected: {expected_full[:60]}...")
-            logger.error(f"   Received: {signature[:60]}...")
-            logger.error(f"   App Secret: {app_secret[:8]}...{app_secret[-4:]}")
-            logger.error(f"   Payload length: {len(payload)} bytes")
-            logger.error(f"   This means the META_APP_SECRET doesn't match the app sending webhooks")
+            logger.error(
+                "❌ Webhook signature verification FAILED - META_APP_SECRET doesn't match the app "
+                "sending webhooks (expected %s%s, received %s, secret %s...%s, payload %d bytes)",
+                SIGNATURE_PREFIX, expected_digest.hex(), signature,
+                app_secret[:8], app_secret[-4:], len(payload)
+            )
         else:
-            logger.info(f"✅ Webhook signature verified successfully")
+            logger.info("✅ Webhook signature verified")
         
         return is_valid
     
@@ -78,20 +180,23 @@ class WhatsAppService:
         Process incoming WhatsApp webhook event.
         """
         try:
-            # Parse webhook structure
-            entry = data.get('entry', [{}])[0]
-            changes = entry.get('changes', [{}])[0]
-            value = changes.get('value', {})
+            # Parse webhook structure; every Meta delivery has these keys, so
+            # index directly and treat a miss as a malformed webhook
+            try:
+                value = data['entry'][0]['changes'][0]['value']
+            except (KeyError, IndexError, TypeError):
+                logger.warning("Malformed WhatsApp webhook: no entry/changes/value")
+                return False
             
             # Check for messages
-            messages = value.get('messages', [])
-            for msg in messages:
-                self._handle_incoming_message(msg, value.get('contacts', []))
+            messages = value.get('messages')
+            if messages:
+                self._handle_incoming_messages(messages, value.get('contacts') or ())
             
             # Check for status updates
-            statuses = value.get('statuses', [])
-            for status in statuses:
-                self._handle_status_update(status)
+            statuses = value.get('statuses')
+            if statuses:
+                self._handle_status_updates(statuses)
             
             return True
             
@@ -99,77 +204,126 @@ class WhatsAppService:
             logger.exception(f"Error processing WhatsApp webhook: {e}")
             return False
     
-    def _handle_incoming_message(self, msg: Dict, contacts: list):
-        """Handle incoming message from WhatsApp."""
-        sender_phone = msg.get('from', '')
-        message_type = msg.get('type', 'text')
-        timestamp = msg.get('timestamp', '')
-        wa_message_id = msg.get('id', '')
-        
-        # Get sender name from contacts
-        sender_name = "WhatsApp User"
+    def _handle_incoming_messages(self, messages: list, contacts: list):
+        """
+        Handle a batch of incoming messages from WhatsApp.
+        Meta can deliver several messages in one webhook, so open conversations
+        are looked up in one query and customer messages are inserted with a
+        single bulk_create instead of per-message round-trips.
+        """
+        # Get sender names from contacts
+        sender_names = {}
         for contact in contacts:
-            if contact.get('wa_id') == sender_phone:
-                profile = contact.get('profile', {})
-                sender_name = profile.get('name', sender_name)
-                break
+            wa_id = contact.get('wa_id')
+            if wa_id not in sender_names:
+                sender_names[wa_id] = contact.get('profile', {}).get('name', "WhatsApp User")
         
-        # Extract message content based on type
-        content = ""
-        if message_type == 'text':
-            content = msg.get('text', {}).get('body', '')
-        elif message_type == 'interactive':
-            interactive = msg.get('interactive', {})
-            if interactive.get('type') == 'button_reply':
-                content = interactive.get('button_reply', {}).get('title', '')
-            elif interactive.get('type') == 'list_reply':
-                content = interactive.get('list_reply', {}).get('title', '')
-        elif message_type in ['image', 'audio', 'video', 'document']:
-            content = f"[{message_type.upper()}] Media message received"
-        else:
-            content = f"[{message_type.upper()}] Unsupported message type"
+        managers = {}
+        customer_messages = []
+        seen_ids = set()
+        for msg in messages:
+            sender_phone = msg.get('from', '')
+            message_type = msg.get('type', 'text')
+            wa_message_id = msg.get('id', '')
+            content = self._extract_content(msg, message_type)
+            
+            # ==========================================
+            # CHECK IF MESSAGE IS FROM A MANAGER
+            # ==========================================
+            if sender_phone not in managers:
+                managers[sender_phone] = ManagerNumber.get_by_phone(sender_phone, self.organization)
+            manager = managers[sender_phone]
+            if manager:
+                logger.info(f"📢 Manager message detected from {manager.name} ({sender_phone})")
+                self._handle_manager_message(manager, content, wa_message_id)
+                continue
+            
+            # Meta can repeat a message within one delivery as well as redeliver it
+            if wa_message_id:
+                if wa_message_id in seen_ids:
+                    continue
+                seen_ids.add(wa_message_id)
+            customer_messages.append(Message(
+                sender=MessageSender.CUSTOMER,
+                content=content,
+                channel_message_id=wa_message_id,
+                ai_metadata={
+                    'message_type': message_type,
+                    'sender_phone': sender_phone,
+                    'timestamp': msg.get('timestamp', '')
+                }
+            ))
         
-        # ==========================================
-        # CHECK IF MESSAGE IS FROM A MANAGER
-        # ==========================================
-        manager = ManagerNumber.get_by_phone(sender_phone, self.organization)
-        if manager:
-            logger.info(f"📢 Manager message detected from {manager.name} ({sender_phone})")
-            self._handle_manager_message(manager, content, wa_message_id)
+        if not customer_messages:
             return
         
         # ==========================================
         # REGULAR CUSTOMER MESSAGE PROCESSING
         # ==========================================
         
-        # Find or create conversation
-        conversation = self._get_or_create_conversation(
-            sender_phone, 
-            sender_name
-        )
+        # Find or create conversations for every sender in the batch
+        conversations = self._get_or_create_conversations({
+            m.ai_metadata['sender_phone']: sender_names.get(m.ai_metadata['sender_phone'], "WhatsApp User")
+            for m in customer_messages
+        })
+        for message in customer_messages:
+            message.conversation = conversations[message.ai_metadata['sender_phone']]
         
-        # Create message
-        message = Message.objects.create(
-            conversation=conversation,
-            sender=MessageSender.CUSTOMER,
-            content=content,
-            channel_message_id=wa_message_id,
-            ai_metadata={
-                'message_type': message_type,
-                'sender_phone': sender_phone,
-                'timestamp': timestamp
-            }
-        )
+        # Create messages. bulk_create skips the Message post_save
+        # receiver, so record each conversation's latest message and unread
+        # count here (one UPDATE per sender in the batch, usually just one).
+        Message.objects.bulk_create(customer_messages, ignore_conflicts=True)
+        # Messages already stored (a redelivered webhook, possibly racing this
+        # one) were skipped by ON CONFLICT; count and answer only the new ones
+        inserted = set(Message.objects.filter(
+            pk__in=[message.pk for message in customer_messages]
+        ).values_list('pk', flat=True))
+        customer_messages = [message for message in customer_messages if message.pk in inserted]
+        if not customer_messages:
+            return
+        now = timezone.now()
+        latest = {message.conversation_id: message for message in customer_messages}
+        received = Counter(message.conversation_id for message in customer_messages)
+        for conversation in conversations.values():
+            if conversation.id not in latest:
+                continue
+            fields = latest[conversation.id].last_message_fields()
+            fields['updated_at'] = now
+            Conversation.objects.filter(pk=conversation.id).update(
+                **fields, unread_customer_count=F('unread_customer_count') + received[conversation.id]
+            )
+            for name, value in fields.items():
+                setattr(conversation, name, value)
+            conversation.unread_customer_count += received[conversation.id]
         
-        # Update conversation state
-        if conversation.state not in [ConversationState.HUMAN_HANDOFF]:
-            conversation.state = ConversationState.AI_HANDLING
-            conversation.save()
+        for message in customer_messages:
+            conversation = message.conversation
             
-            # Process with AI (async in production)
-            self._process_with_ai(conversation, message)
-        
-        logger.info(f"WhatsApp message received from {sender_phone}: {content[:50]}...")
+            # Update conversation state
+            if conversation.state not in [ConversationState.HUMAN_HANDOFF]:
+                conversation.state = ConversationState.AI_HANDLING
+                conversation.save(update_fields=['state', 'updated_at'])
+                
+                # Process with AI off the webhook request path
+                self._queue_ai_processing(message)
+            
+            logger.info(f"WhatsApp message received from {conversation.customer_phone}: {message.content[:50]}...")
+    
+    @staticmethod
+    def _extract_content(msg: Dict, message_type: str) -> str:
+        """Extract message content based on type."""
+        if message_type == 'text':
+            return msg.get('text', {}).get('body', '')
+        if message_type == 'interactive':
+            interactive = msg.get('interactive', {})
+            if interactive.get('type') == 'button_reply':
+                return interactive.get('button_reply', {}).get('title', '')
+            if interactive.get('type') == 'list_reply':
+                return interactive.get('list_reply', {}).get('title', '')
+            return ""
+        if message_type in ['image', 'audio', 'video', 'document']:
+            return f"[{message_type.upper()}] Media message received"
+        return f"[{message_type.upper()}] Unsupported message type"
     
     def _handle_manager_message(self, manager: ManagerNumber, content: str, wa_message_id: str):
         """
@@ -196,31 +350,53 @@ class WhatsAppService:
                 f"❌ Sorry, there was an error processing your command. Please try again.\n\nError: {str(e)[:100]}"
             )
     
-    def _get_or_create_conversation(self, phone: str, name: str) -> Conversation:
-        """Get or create conversation for a WhatsApp user."""
-        # Try to find existing active conversation
-        conversation = Conversation.objects.filter(
+    def _get_or_create_conversations(self, names: Dict[str, str]) -> Dict[str, Conversation]:
+        """
+        Get or create conversations for a set of WhatsApp users.
+        `names` maps phone -> display name; returns phone -> Conversation.
+        """
+        # Find existing active conversations in one query (default ordering
+        # puts the most recent first, matching the old per-phone .first())
+        conversations = {}
+        for conversation in Conversation.objects.filter(
             organization=self.organization,
             channel=Channel.WHATSAPP,
-            customer_phone=phone,
-            state__in=[
-                ConversationState.NEW,
-                ConversationState.AI_HANDLING,
-                ConversationState.AWAITING_USER,
-                ConversationState.HUMAN_HANDOFF
-            ]
-        ).first()
+            customer_phone__in=list(names),
+            state__in=self.OPEN_STATES
+        ):
+            conversations.setdefault(conversation.customer_phone, conversation)
         
-        if not conversation:
-            conversation = Conversation.objects.create(
-                organization=self.organization,
-                channel=Channel.WHATSAPP,
-                customer_name=name,
-                customer_phone=phone,
-                state=ConversationState.NEW
-            )
+        # New conversations are created one by one so post_save listeners
+        # (CRM customer sync) still fire. get_or_create falls back to the
+        # existing row if a concurrent webhook wins the uniq_open_conversation
+        # constraint.
+        for phone, name in names.items():
+            if phone not in conversations:
+                conversations[phone], _ = Conversation.objects.get_or_create(
+                    organization=self.organization,
+                    channel=Channel.WHATSAPP,
+                    customer_phone=phone,
+                    state__in=self.OPEN_STATES,
+                    defaults={
+                        'customer_name': name,
+                        'state': ConversationState.NEW,
+                    }
+                )
         
-        return conversation
+        return conversations
+    
+    def _queue_ai_processing(self, message: Message):
+        """Hand the AI reply off to Celery once the message is committed."""
+        transaction.on_commit(lambda: self._enqueue_ai_processing(message))
+    
+    def _enqueue_ai_processing(self, message: Message):
+        """Queue the AI task; fall back to inline processing if it can't be queued."""
+        try:
+            from .tasks import process_whatsapp_ai_message_task
+            process_whatsapp_ai_message_task.delay(str(self.config.id), str(message.id))
+        except Exception:
+            logger.warning(f"Could not queue AI processing for message {message.id}; processing inline")
+            self._process_with_ai(message.conversation, message)
     
     def _process_with_ai(self, conversation: Conversation, message: Message):
         """Process message with AI and send response. Supports multilingual responses."""
@@ -270,7 +446,7 @@ class WhatsAppService:
                         logger.info(f"🚨 Handoff alert created: {alert.id}")
                         # Transition conversation to human handoff state
                         conversation.state = ConversationState.HUMAN_HANDOFF
-                        conversation.save()
+                        conversation.save(update_fields=['state', 'updated_at'])
                 
                 # Send via WhatsApp
                 logger.info(f"📤 Sending WhatsApp message to {conversation.customer_phone} in {detected_lang}")
@@ -281,7 +457,7 @@ class WhatsAppService:
                 
                 if sent_message_id:
                     ai_message.channel_message_id = sent_message_id
-                    ai_message.save()
+                    ai_message.save(update_fields=['channel_message_id'])
                     logger.info(f"✅ WhatsApp message sent successfully - ID: {sent_message_id}")
                 else:
                     logger.error(f"❌ CRITICAL: Failed to send WhatsApp message - check access_token and phone_number_id")
@@ -289,7 +465,7 @@ class WhatsAppService:
                 
                 # Update conversation state
                 conversation.state = ConversationState.AWAITING_USER
-                conversation.save()
+                conversation.save(update_fields=['state', 'updated_at'])
             else:
                 logger.error(f"❌ No response from AI service")
                 
@@ -402,23 +578,30 @@ class WhatsAppService:
         except Exception as e:
             logger.exception(f"❌ Error processing real estate data: {e}")
     
-    def _handle_status_update(self, status: Dict):
-        """Handle message status update (sent, delivered, read)."""
-        wa_message_id = status.get('id', '')
-        status_type = status.get('status', '')
+    def _handle_status_updates(self, statuses: list):
+        """
+        Handle message status updates (sent, delivered, read).
+        Written as one UPDATE per distinct status in the batch (usually one)
+        instead of a SELECT + save per receipt.
+        """
+        # Last status wins when a message appears more than once in the batch
+        latest = {}
+        for status in statuses:
+            wa_message_id = status.get('id', '')
+            status_type = status.get('status', '')
+            logger.debug(f"WhatsApp status update: {wa_message_id} -> {status_type}")
+            if wa_message_id:
+                latest[wa_message_id] = status_type
         
-        logger.debug(f"WhatsApp status update: {wa_message_id} -> {status_type}")
+        ids_by_status = {}
+        for wa_message_id, status_type in latest.items():
+            ids_by_status.setdefault(status_type, []).append(wa_message_id)
         
-        # Update message status if needed
-        try:
-            # Use channel_message_id instead of metadata for lookups
-            message = Message.objects.get(channel_message_id=wa_message_id)
-            if message.ai_metadata is None:
-                message.ai_metadata = {}
-            message.ai_metadata['delivery_status'] = status_type
-            message.save()
-        except Message.DoesNotExist:
-            pass
+        # Use channel_message_id instead of metadata for lookups
+        for status_type, wa_message_ids in ids_by_status.items():
+            Message.objects.filter(channel_message_id__in=wa_message_ids).update(
+                ai_metadata=JSONSetKey('ai_metadata', 'delivery_status', status_type)
+            )
     
     def send_message(self, to: str, text: str) -> Optional[str]:
         """
@@ -426,27 +609,20 @@ class WhatsAppService:
         Returns message ID on success.
         """
         if not self.config.is_active:
-            logger.error(f"❌ CRITICAL: WhatsApp config is_active=False for {self.organization.name}")
-            logger.error(f"Set is_active=True in WhatsApp configuration to enable messaging")
+            logger.error("❌ CRITICAL: WhatsApp config is_active=False for %s - set is_active=True "
+                         "in WhatsApp configuration to enable messaging", self.organization.name)
             return None
             
         if not self.config.access_token:
-            logger.error(f"❌ CRITICAL: WhatsApp access_token is empty for {self.organization.name}")
-            logger.error(f"Add valid Meta API access token to WhatsApp configuration")
+            logger.error("❌ CRITICAL: WhatsApp access_token is empty for %s - add a valid Meta API "
+                         "access token to WhatsApp configuration", self.organization.name)
             return None
             
         if not self.config.phone_number_id:
-            logger.error(f"❌ CRITICAL: WhatsApp phone_number_id is empty for {self.organization.name}")
-            logger.error(f"Add phone_number_id from Meta Business to WhatsApp configuration")
+            logger.error("❌ CRITICAL: WhatsApp phone_number_id is empty for %s - add phone_number_id "
+                         "from Meta Business to WhatsApp configuration", self.organization.name)
             return None
         
-        url = f"{self.GRAPH_API_URL}/{self.config.phone_number_id}/messages"
-        
-        headers = {
-            "Authorization": f"Bearer {self.config.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -459,29 +635,33 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = self._http().post(self._url, data=json_dumps(payload), headers=self._headers, timeout=30)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_loads(response.content)
             message_id = result.get('messages', [{}])[0].get('id')
             
-            logger.info(f"WhatsApp message sent to {to}: {message_id}")
+            logger.info("WhatsApp message sent to %s: %s", to, message_id)
             return message_id
             
         except requests.exceptions.RequestException as e:
-            # Log the full error response from Graph API
-            error_detail = f"Failed to send WhatsApp message: {e}"
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_json = e.response.json()
-                    logger.error(f"Graph API Error Response: {error_json}")
-                    error_detail += f" | API Response: {error_json}"
-                except:
-                    logger.error(f"Graph API Error Response (text): {e.response.text}")
-                    error_detail += f" | API Response: {e.response.text}"
-            logger.exception(error_detail)
+            # Log the error response from Graph API along with the failure
+            error_body = self._error_body(e.response) if e.response is not None else None
+            logger.exception("Failed to send WhatsApp message: %s | API Response: %s", e, error_body)
             return None
     
+    @staticmethod
+    def _error_body(response) -> Any:
+        """
+        Graph API error body for logging: parsed JSON, or the decoded text for
+        non-JSON bodies (e.g. CDN rate-limit pages), capped at ERROR_BODY_LIMIT bytes.
+        """
+        content = response.content[:ERROR_BODY_LIMIT]
+        try:
+            return json_loads(content)
+        except ValueError:
+            return content.decode('utf-8', errors='replace')
+    
     def send_interactive_buttons(
         self, 
         to: str, 
@@ -495,13 +675,6 @@ class WhatsAppService:
         if not self.config.is_active:
             return None
         
-        url = f"{self.GRAPH_API_URL}/{self.config.phone_number_id}/messages"
-        
-        headers = {
-            "Authorization": f"Bearer {self.config.access_token}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -520,9 +693,9 @@ class WhatsAppService:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = self._http().post(self._url, data=json_dumps(payload), headers=self._headers, timeout=30)
             response.raise_for_status()
-            return response.json().get('messages', [{}])[0].get('id')
+            return json_loads(response.content).get('messages', [{}])[0].get('id')
         except Exception as e:
             logger.exception(f"Failed to send WhatsApp buttons: {e}")
             return None
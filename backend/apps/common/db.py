@@ -0,0 +1,67 @@
+"""
+Shared database fields and expressions.
+
+FastJSONField is a JSONField that decodes column values with orjson (see
+utils.json_loads) instead of the stdlib json module. Django fetches jsonb
+from psycopg as text and decodes it itself in from_db_value(), so a
+psycopg-level loader would never run; the field is where the decode happens.
+
+JSONSetKey writes one top-level key of a JSONField inside an UPDATE, so hot
+paths (e.g. WhatsApp delivery receipts) don't need a SELECT + full-row save
+per row:
+
+    Message.objects.filter(...).update(
+        ai_metadata=JSONSetKey('ai_metadata', 'delivery_status', 'read')
+    )
+
+Compiles to jsonb_set() on PostgreSQL (production) and JSON_SET() on
+SQLite/MySQL (local + tests). A NULL column is treated as {}.
+"""
+import json
+
+from django.db import models
+from django.db.models import Func, Value
+from django.db.models.fields.json import KeyTransform
+
+from .utils import json_loads
+
+
+class FastJSONField(models.JSONField):
+    """JSONField read with orjson; writes and lookups are unchanged."""
+
+    def from_db_value(self, value, expression, connection):
+        if self.decoder is not None or value is None:
+            return super().from_db_value(value, expression, connection)
+        # Some backends (SQLite at least) extract non-string values in their
+        # SQL datatypes.
+        if isinstance(expression, KeyTransform) and not isinstance(value, str):
+            return value
+        try:
+            return json_loads(value)
+        except json.JSONDecodeError:
+            return value
+
+
+class JSONSetKey(Func):
+    output_field = models.JSONField()
+
+    def __init__(self, expression, key: str, value: str):
+        if not key.isidentifier():
+            raise ValueError(f"JSONSetKey only supports plain top-level keys, got {key!r}")
+        self.key = key
+        super().__init__(expression, Value(value, output_field=models.TextField()))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        field, value = self.get_source_expressions()
+        field_sql, field_params = compiler.compile(field)
+        value_sql, value_params = compiler.compile(value)
+        if connection.vendor == 'postgresql':
+            sql = (
+                f"jsonb_set(COALESCE({field_sql}, '{{}}'::jsonb), %s::text[], "
+                f"to_jsonb({value_sql}::text))"
+            )
+            path = '{%s}' % self.key
+        else:
+            sql = f"JSON_SET(COALESCE({field_sql}, '{{}}'), %s, {value_sql})"
+            path = f'$.{self.key}'
+        return sql, (*field_params, path, *value_params)
@@ -8,7 +8,12 @@ Two cross-cutting invariants, generalized from apps/inventory:
    membership; cross-org object access returns 404 (don't leak existence);
    writes require owner role on the payload's org.
 
-2. AuditLoggedMixin — auto-logs create/update/destroy with before/after JSON +
+2. UserOrgIdsMixin — the user's membership org ids (and per-org membership
+   rows), looked up once per request and memoized on the request (DRF calls
+   get_queryset() several times; actions repeat the same membership checks).
+   The org ids are also cached across requests (see org_ids.py).
+
+3. AuditLoggedMixin — auto-logs create/update/destroy with before/after JSON +
    computed diff to a pluggable audit-log model (override get_audit_log_model()).
 """
 import logging
@@ -17,22 +22,44 @@ from django.http import Http404
 from rest_framework.exceptions import PermissionDenied, ValidationError
 
 from apps.accounts.models import OrganizationMembership, Location
+from .org_ids import get_user_org_ids
 from .utils import client_ip, model_to_dict, diff
 
 logger = logging.getLogger(__name__)
 
 
-class OrgScopeMixin:
+class UserOrgIdsMixin:
     """
-    Mix into any ViewSet whose model has an `organization` FK (and optionally
-    a `location` FK). Behavior is identical to the proven inventory mixin.
+    Memoizes the requesting user's membership org ids on the request, so the
+    OrganizationMembership lookup runs at most once (not at all on an org id
+    cache hit) however many times get_queryset(), get_object() and the
+    actions ask for it.
     """
 
     def _user_org_ids(self):
-        return list(
-            OrganizationMembership.objects.filter(user=self.request.user)
-            .values_list('organization_id', flat=True)
-        )
+        org_ids = getattr(self.request, '_org_ids', None)
+        if org_ids is None:
+            org_ids = self.request._org_ids = get_user_org_ids(self.request.user)
+        return org_ids
+
+    def _get_membership(self, org_id):
+        """The user's OrganizationMembership in org_id, or None. Memoized per org."""
+        memo = getattr(self.request, '_membership_cache', None)
+        if memo is None:
+            memo = self.request._membership_cache = {}
+        key = str(org_id)
+        if key not in memo:
+            memo[key] = OrganizationMembership.objects.filter(
+                user=self.request.user, organization_id=org_id
+            ).first()
+        return memo[key]
+
+
+class OrgScopeMixin(UserOrgIdsMixin):
+    """
+    Mix into any ViewSet whose model has an `organization` FK (and optionally
+    a `location` FK). Behavior is identical to the proven inventory mixin.
+    """
 
     def get_queryset(self):
         qs = super().get_queryset()
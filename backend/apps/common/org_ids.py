@@ -0,0 +1,50 @@
+"""
+Cross-request cache of a user's membership organization ids.
+
+Nearly every authenticated API request scopes its queryset to the user's
+organizations. The id list changes only when a membership is added or
+removed, so it is cached per user and dropped by the OrganizationMembership
+signal receivers (see signals.py). Like idempotency.py, a cache outage
+FAILS OPEN to the database rather than erroring the request.
+"""
+import logging
+
+from django.core.cache import cache
+
+from apps.accounts.models import OrganizationMembership
+
+logger = logging.getLogger(__name__)
+
+USER_ORG_IDS_TTL = 300
+
+
+def user_org_ids_cache_key(user_id) -> str:
+    return f'user_orgs:{user_id}'
+
+
+def get_user_org_ids(user) -> tuple:
+    """The organization ids `user` is a member of."""
+    key = user_org_ids_cache_key(user.pk)
+    try:
+        org_ids = cache.get(key)
+    except Exception:
+        logger.warning('Org id cache unavailable; reading memberships of user=%s from the database', user.pk)
+        org_ids = None
+    if org_ids is None:
+        org_ids = tuple(
+            OrganizationMembership.objects.filter(user=user)
+            .values_list('organization_id', flat=True)
+        )
+        try:
+            cache.set(key, org_ids, USER_ORG_IDS_TTL)
+        except Exception:
+            pass
+    return org_ids
+
+
+def invalidate_user_org_ids(user_id) -> None:
+    """Best-effort; never raises."""
+    try:
+        cache.delete(user_org_ids_cache_key(user_id))
+    except Exception:
+        logger.warning('Could not invalidate org id cache for user=%s', user_id)
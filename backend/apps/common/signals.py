@@ -0,0 +1,20 @@
+"""
+Drop a user's cached organization ids (see org_ids.py) whenever one of their
+memberships is created, changed or deleted.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.models import OrganizationMembership
+
+from .org_ids import invalidate_user_org_ids
+
+
+@receiver(post_save, sender=OrganizationMembership)
+@receiver(post_delete, sender=OrganizationMembership)
+def invalidate_membership_org_ids(sender, instance, **kwargs):
+    # After the commit: dropped any earlier, a concurrent request could still
+    # read the old memberships and cache them again for the full TTL
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_user_org_ids(user_id))
@@ -5,10 +5,13 @@ Driven against a minimal ViewSet built on the real InventoryItem model so we
 exercise the shared mixin exactly as a Phase 1+ app would use it.
 """
 import pytest
+from django.core.cache import cache
 from rest_framework import serializers, viewsets
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from apps.accounts.models import OrganizationMembership
 from apps.common.mixins import OrgScopeMixin
+from apps.common.org_ids import user_org_ids_cache_key
 from apps.inventory.models import InventoryItem
 
 pytestmark = pytest.mark.django_db
@@ -105,3 +108,34 @@ def test_perform_create_owner_succeeds(owner, org):
     resp = view(request)
     assert resp.status_code == 201
     assert InventoryItem.objects.filter(name='OwnerItem', organization=org).exists()
+
+
+def test_user_org_ids_memoized_per_request(owner, org, django_assert_num_queries):
+    viewset = _ItemViewSet()
+    viewset.request = factory.get('/x/')
+    viewset.request.user = owner
+    with django_assert_num_queries(1):
+        first = viewset._user_org_ids()
+        second = viewset._user_org_ids()
+    assert first == second == (org.id,)
+
+
+def test_get_membership_memoized_per_org(owner, org, org_b, django_assert_num_queries):
+    viewset = _ItemViewSet()
+    viewset.request = factory.get('/x/')
+    viewset.request.user = owner
+    with django_assert_num_queries(2):
+        assert viewset._get_membership(org.id).role == 'owner'
+        assert viewset._get_membership(str(org.id)).role == 'owner'
+        assert viewset._get_membership(org_b.id) is None
+        assert viewset._get_membership(org_b.id) is None
+
+
+def test_removed_member_denied_after_commit(owner, org, item, settings, django_capture_on_commit_callbacks):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    assert _list_for(owner).data['count'] >= 1
+    with django_capture_on_commit_callbacks(execute=True):
+        OrganizationMembership.objects.filter(user=owner).delete()
+        # A request racing the delete caches the memberships it read before the commit
+        cache.set(user_org_ids_cache_key(owner.pk), (org.id,))
+    assert _list_for(owner).data['count'] == 0
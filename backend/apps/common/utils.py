@@ -1,9 +1,16 @@
 """
 Small shared helpers (promoted verbatim from apps/inventory/views.py so every
-new app's audit logging produces identical snapshots/diffs).
+new app's audit logging produces identical snapshots/diffs), plus the fast JSON
+codec used on the channel webhook / Graph API hot path.
 """
+import json
 from decimal import Decimal
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements
+    orjson = None
+
 
 def client_ip(request):
     """Best-effort client IP, honoring X-Forwarded-For (we sit behind Traefik)."""
@@ -38,3 +45,17 @@ def diff(before: dict, after: dict) -> dict:
         if b != a:
             out[k] = {'before': b, 'after': a}
     return out
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(data):
+    """Parse JSON from bytes/str. Raises json.JSONDecodeError on bad input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
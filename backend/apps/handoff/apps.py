@@ -5,3 +5,6 @@ class HandoffConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.handoff'
     verbose_name = 'Human Handoff'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:31
+
+from django.db import migrations, models
+
+PRIORITY_RANK = {"low": 1, "medium": 2, "high": 3, "urgent": 4}
+
+
+def backfill_priority_rank(apps, schema_editor):
+    HandoffAlert = apps.get_model("handoff", "HandoffAlert")
+    for priority, rank in PRIORITY_RANK.items():
+        if rank != 2:  # the column default
+            HandoffAlert.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "handoff",
+            "0002_rename_handoff_ale_convers_8d5b02_idx_handoff_ale_convers_b962ee_idx_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="handoffalert",
+            name="handoff_ale_priorit_da97d1_idx",
+        ),
+        migrations.AddField(
+            model_name="handoffalert",
+            name="priority_rank",
+            field=models.PositiveSmallIntegerField(default=2, editable=False),
+        ),
+        migrations.RunPython(backfill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="handoffalert",
+            index=models.Index(
+                fields=["priority_rank", "is_acknowledged"], name="handoff_rank_ack_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("handoff", "0003_handoffalert_priority_rank"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="handoffalert",
+            index=models.Index(
+                condition=models.Q(("is_resolved", False)),
+                fields=["conversation"],
+                name="handoff_open_conv_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="handoffalert",
+            index=models.Index(
+                condition=models.Q(("is_resolved", False)),
+                fields=["priority"],
+                name="handoff_open_priority_idx",
+            ),
+        ),
+    ]
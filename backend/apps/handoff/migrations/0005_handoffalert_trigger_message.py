@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:35
+
+from django.db import migrations, models
+
+MARKER = 'Triggering message: "'
+
+
+def backfill_trigger_message(apps, schema_editor):
+    """Copy the message embedded in older reasons as '...Triggering message: "<text>..."'."""
+    HandoffAlert = apps.get_model("handoff", "HandoffAlert")
+    alerts = []
+    for alert in HandoffAlert.objects.filter(reason__contains=MARKER).only("id", "reason").iterator():
+        start = alert.reason.find(MARKER) + len(MARKER)
+        end = alert.reason.rfind('..."')
+        if end > start:
+            alert.trigger_message = alert.reason[start:end]
+            alerts.append(alert)
+    HandoffAlert.objects.bulk_update(alerts, ["trigger_message"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("handoff", "0004_handoffalert_unresolved_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="handoffalert",
+            name="trigger_message",
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(backfill_trigger_message, migrations.RunPython.noop),
+    ]
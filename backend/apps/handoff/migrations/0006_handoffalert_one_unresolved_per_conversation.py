@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:38
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def resolve_duplicate_open_alerts(apps, schema_editor):
+    """
+    Keep only the most recent unresolved alert per conversation; older
+    duplicates left behind by racing handoffs are resolved so the
+    constraint below can be created.
+    """
+    HandoffAlert = apps.get_model("handoff", "HandoffAlert")
+    seen = set()
+    duplicates = []
+    open_alerts = (
+        HandoffAlert.objects.filter(is_resolved=False)
+        .order_by("conversation_id", "-created_at")
+        .values_list("id", "conversation_id")
+    )
+    for pk, conversation_id in open_alerts.iterator():
+        if conversation_id in seen:
+            duplicates.append(pk)
+        else:
+            seen.add(conversation_id)
+    if duplicates:
+        HandoffAlert.objects.filter(id__in=duplicates).update(
+            is_resolved=True,
+            resolved_at=timezone.now(),
+            resolution_notes="Duplicate of a newer alert for this conversation",
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("handoff", "0005_handoffalert_trigger_message"),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicate_open_alerts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="handoffalert",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_resolved", False)),
+                fields=("conversation",),
+                name="one_unresolved_per_conversation",
+            ),
+        ),
+        # The constraint's unique index covers the same lookups
+        migrations.RemoveIndex(
+            model_name="handoffalert",
+            name="handoff_open_conv_idx",
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("handoff", "0006_handoffalert_one_unresolved_per_conversation"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="handoffalert",
+            name="handoff_rank_ack_idx",
+        ),
+        migrations.AddIndex(
+            model_name="handoffalert",
+            index=models.Index(
+                condition=models.Q(("is_resolved", False)),
+                fields=["-priority_rank", "-created_at"],
+                name="handoff_open_severity_idx",
+            ),
+        ),
+    ]
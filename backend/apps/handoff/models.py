@@ -43,7 +43,12 @@ class HandoffAlert(models.Model):
         choices=Priority.choices,
         default=Priority.MEDIUM
     )
+    # Small-int mirror of priority (see PRIORITY_RANK), kept in sync by
+    # save(); indexed and compared instead of the priority strings
+    priority_rank = models.PositiveSmallIntegerField(default=2, editable=False)
     reason = models.TextField()
+    # Customer message that triggered the alert (first 200 chars)
+    trigger_message = models.TextField(blank=True)
 
     # Status
     is_acknowledged = models.BooleanField(default=False)
@@ -74,30 +79,77 @@ class HandoffAlert(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['conversation', '-created_at']),
-            models.Index(fields=['priority', 'is_acknowledged']),
+            # "Most urgent open alerts first" (?status=pending&ordering=-priority_rank,-created_at)
+            # reads this in order instead of sorting
+            models.Index(
+                fields=['-priority_rank', '-created_at'],
+                condition=models.Q(is_resolved=False),
+                name='handoff_open_severity_idx',
+            ),
+            # Unresolved alerts stay few while resolved ones pile up; this
+            # covers the stats counts (the "open alert for this
+            # conversation?" check uses the constraint's index below)
+            models.Index(
+                fields=['priority'],
+                condition=models.Q(is_resolved=False),
+                name='handoff_open_priority_idx',
+            ),
+        ]
+        constraints = [
+            # At most one open alert per conversation, even when two
+            # handoffs for it race (see services.create_handoff_alert)
+            models.UniqueConstraint(
+                fields=['conversation'],
+                condition=models.Q(is_resolved=False),
+                name='one_unresolved_per_conversation',
+            ),
         ]
 
     def __str__(self):
         return f"{self.alert_type} - {self.conversation}"
 
+    def save(self, *args, **kwargs):
+        self.priority_rank = PRIORITY_RANK.get(self.priority, self.priority_rank)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'priority_rank']
+        super().save(*args, **kwargs)
+
+    ACKNOWLEDGE_FIELDS = ['is_acknowledged', 'acknowledged_by', 'acknowledged_at']
+    RESOLVE_FIELDS = ['is_resolved', 'resolved_by', 'resolved_at', 'resolution_notes']
+
+    def _set_acknowledged(self, user, now):
+        self.is_acknowledged = True
+        self.acknowledged_by = user
+        self.acknowledged_at = now
+
     def acknowledge(self, user):
         """Mark alert as acknowledged."""
         from django.utils import timezone
-        self.is_acknowledged = True
-        self.acknowledged_by = user
-        self.acknowledged_at = timezone.now()
-        self.save()
+        self._set_acknowledged(user, timezone.now())
+        self.save(update_fields=self.ACKNOWLEDGE_FIELDS)
 
     def resolve(self, user, notes: str = ""):
-        """Mark alert as resolved."""
+        """Mark alert as resolved (acknowledging it too if needed) in one UPDATE."""
         from django.utils import timezone
+        now = timezone.now()
         self.is_resolved = True
         self.resolved_by = user
-        self.resolved_at = timezone.now()
+        self.resolved_at = now
         self.resolution_notes = notes
+        update_fields = list(self.RESOLVE_FIELDS)
         if not self.is_acknowledged:
-            self.acknowledge(user)
-        self.save()
+            self._set_acknowledged(user, now)
+            update_fields += self.ACKNOWLEDGE_FIELDS
+        self.save(update_fields=update_fields)
+
+
+PRIORITY_RANK = {
+    HandoffAlert.Priority.LOW: 1,
+    HandoffAlert.Priority.MEDIUM: 2,
+    HandoffAlert.Priority.HIGH: 3,
+    HandoffAlert.Priority.URGENT: 4,
+}
 
 
 class EscalationRule(models.Model):
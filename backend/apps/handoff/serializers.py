@@ -3,12 +3,11 @@ Handoff serializers.
 """
 from rest_framework import serializers
 from .models import HandoffAlert, EscalationRule
-from apps.messaging.serializers import ConversationSerializer
 
 
 class HandoffAlertSerializer(serializers.ModelSerializer):
     """Serializer for HandoffAlert."""
-    conversation = serializers.UUIDField(source='conversation.id', read_only=True)
+    conversation = serializers.UUIDField(source='conversation_id', read_only=True)
     conversation_customer_name = serializers.CharField(source='conversation.customer_name', read_only=True)
     conversation_channel = serializers.CharField(source='conversation.channel', read_only=True)
     type = serializers.CharField(source='alert_type', read_only=True)
@@ -30,7 +29,9 @@ class HandoffAlertSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
     def get_status(self, obj):
-        """Derive status from is_acknowledged and is_resolved."""
+        """Derive status from is_acknowledged and is_resolved (annotated by the viewset)."""
+        if hasattr(obj, 'status'):
+            return obj.status
         if obj.is_resolved:
             return 'resolved'
         elif obj.is_acknowledged:
@@ -39,14 +40,12 @@ class HandoffAlertSerializer(serializers.ModelSerializer):
             return 'pending'
     
     def get_trigger_message(self, obj):
-        """Extract trigger message from reason if embedded there."""
-        reason = obj.reason or ''
-        if 'Triggering message: "' in reason:
-            start = reason.find('Triggering message: "') + len('Triggering message: "')
-            end = reason.rfind('"...')
-            if end > start:
-                return reason[start:end]
-        # Try to get last customer message from conversation
+        """Stored trigger message, else the last customer message."""
+        if obj.trigger_message:
+            return obj.trigger_message
+        # Annotated by the viewset
+        if hasattr(obj, 'last_customer_message'):
+            return obj.last_customer_message
         from apps.messaging.models import MessageSender
         last_customer_msg = obj.conversation.messages.filter(
             sender=MessageSender.CUSTOMER
@@ -54,16 +53,30 @@ class HandoffAlertSerializer(serializers.ModelSerializer):
         return last_customer_msg.content[:200] if last_customer_msg else None
 
     def get_acknowledged_by_name(self, obj):
+        if hasattr(obj, 'ack_full_name'):
+            return (obj.ack_full_name or '').strip() or None
         if obj.acknowledged_by:
             return f"{obj.acknowledged_by.first_name} {obj.acknowledged_by.last_name}".strip()
         return None
 
     def get_resolved_by_name(self, obj):
+        if hasattr(obj, 'res_full_name'):
+            return (obj.res_full_name or '').strip() or None
         if obj.resolved_by:
             return f"{obj.resolved_by.first_name} {obj.resolved_by.last_name}".strip()
         return None
 
 
+class HandoffAlertListSerializer(HandoffAlertSerializer):
+    """Serializer for listing alerts (no resolution notes)."""
+
+    class Meta(HandoffAlertSerializer.Meta):
+        fields = [
+            field for field in HandoffAlertSerializer.Meta.fields
+            if field != 'resolution_notes'
+        ]
+
+
 class EscalationRuleSerializer(serializers.ModelSerializer):
     """Serializer for EscalationRule."""
 
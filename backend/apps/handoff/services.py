@@ -3,10 +3,41 @@ Handoff services for creating and managing alerts.
 """
 import logging
 from typing import Optional
-from .models import HandoffAlert
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import HandoffAlert, PRIORITY_RANK
 
 logger = logging.getLogger(__name__)
 
+# Per-organization alert counts behind the stats endpoint
+STATS_CACHE_TTL = 30
+
+
+def stats_cache_key(org_id) -> str:
+    # Dated, so resolved_today starts over at local midnight
+    return f'handoff_stats:{org_id}:{timezone.localdate().isoformat()}'
+
+
+def invalidate_stats_cache(org_id):
+    """Drop an organization's cached alert stats; a cache outage only delays the refresh."""
+    try:
+        cache.delete(stats_cache_key(org_id))
+    except Exception:
+        logger.warning('Could not invalidate handoff stats cache for org=%s', org_id)
+
+
+# AI handoff_reason -> alert type, built once rather than on every handoff
+_ALERT_TYPE_BY_REASON = {
+    'low_confidence': HandoffAlert.AlertType.LOW_CONFIDENCE,
+    'ai_requested': HandoffAlert.AlertType.ESCALATION_REQUEST,
+    'ai_error': HandoffAlert.AlertType.OTHER,
+    'no_api_key': HandoffAlert.AlertType.OTHER,
+    'explicit_request': HandoffAlert.AlertType.ESCALATION_REQUEST,
+    'complaint': HandoffAlert.AlertType.COMPLAINT,
+}
+
 
 def create_handoff_alert(
     conversation,
@@ -30,41 +61,153 @@ def create_handoff_alert(
     """
     try:
         # Check if there's already an unresolved alert for this conversation
-        existing_alert = HandoffAlert.objects.filter(
+        unresolved = HandoffAlert.objects.filter(
             conversation=conversation,
             is_resolved=False
-        ).first()
-        
-        if existing_alert:
-            logger.info(f"Alert already exists for conversation {conversation.id}")
-            # Update priority if new one is higher
-            priority_order = ['low', 'medium', 'high', 'urgent']
-            if priority_order.index(priority) > priority_order.index(existing_alert.priority):
-                existing_alert.priority = priority
-                existing_alert.save(update_fields=['priority'])
-                logger.info(f"Updated alert priority to {priority}")
-            return existing_alert
-        
-        # Construct the reason message
-        full_reason = reason
-        if trigger_message:
-            full_reason = f"{reason}\n\nTriggering message: \"{trigger_message[:200]}...\""
-        
-        alert = HandoffAlert.objects.create(
-            conversation=conversation,
-            alert_type=alert_type,
-            priority=priority,
-            reason=full_reason or f"Conversation requires human attention ({alert_type})"
         )
+        existing_alert = unresolved.first()
         
-        logger.info(f"🚨 Created handoff alert for conversation {conversation.id}: {alert_type} - {priority}")
-        return alert
+        if existing_alert is None:
+            try:
+                # Savepoint, so a lost race doesn't poison an outer transaction
+                with transaction.atomic():
+                    alert = HandoffAlert.objects.create(
+                        conversation=conversation,
+                        alert_type=alert_type,
+                        priority=priority,
+                        reason=reason or f"Conversation requires human attention ({alert_type})",
+                        trigger_message=trigger_message[:200]
+                    )
+            except IntegrityError:
+                # A concurrent handoff created the open alert first
+                # (one_unresolved_per_conversation); treat it as existing
+                existing_alert = unresolved.first()
+                if existing_alert is None:
+                    raise
+            else:
+                logger.info(f"🚨 Created handoff alert for conversation {conversation.id}: {alert_type} - {priority}")
+                return alert
         
+        logger.info(f"Alert already exists for conversation {conversation.id}")
+        # Update priority if new one is higher. The rank check is repeated
+        # in the UPDATE's WHERE clause, so a concurrent raise to an even
+        # higher priority is never overwritten.
+        rank = PRIORITY_RANK[priority]
+        if rank > existing_alert.priority_rank and unresolved.filter(
+            pk=existing_alert.pk,
+            priority_rank__lt=rank
+        ).update(priority=priority, priority_rank=rank):
+            existing_alert.priority = priority
+            existing_alert.priority_rank = rank
+            # Queryset updates skip the post_save receiver
+            invalidate_stats_cache(conversation.organization_id)
+            logger.info(f"Updated alert priority to {priority}")
+        return existing_alert
+
     except Exception as e:
         logger.exception(f"Failed to create handoff alert: {e}")
         return None
 
 
+def create_handoff_alerts_bulk(alert_specs: list, batch_size: int = 1000) -> dict:
+    """
+    Batch counterpart of create_handoff_alert for backfills and re-evaluating
+    historical conversations: one lookup, one bulk_create and one bulk_update
+    however many specs are passed.
+    
+    Args:
+        alert_specs: dicts of create_handoff_alert keyword arguments
+            (conversation, alert_type, priority, reason, trigger_message)
+        batch_size: rows per INSERT/UPDATE statement
+    
+    Returns:
+        {'created': <alerts created>, 'upgraded': <alerts whose priority was raised>}
+    """
+    # Highest-priority spec per conversation, as repeated calls would leave it
+    specs = {}
+    for spec in alert_specs:
+        priority = spec.get('priority', HandoffAlert.Priority.MEDIUM)
+        current = specs.get(spec['conversation'].pk)
+        if current is None or PRIORITY_RANK[priority] > PRIORITY_RANK[current['priority']]:
+            specs[spec['conversation'].pk] = {**spec, 'priority': priority}
+    
+    existing = {
+        alert.conversation_id: alert
+        for alert in HandoffAlert.objects.filter(
+            conversation_id__in=specs,
+            is_resolved=False
+        ).only('id', 'conversation_id', 'priority', 'priority_rank')
+    }
+    
+    new_alerts = []
+    upgrades = []
+    for conversation_id, spec in specs.items():
+        rank = PRIORITY_RANK[spec['priority']]
+        alert = existing.get(conversation_id)
+        if alert is None:
+            alert_type = spec.get('alert_type', HandoffAlert.AlertType.OTHER)
+            # bulk_create skips save(), so priority_rank is set here
+            new_alerts.append(HandoffAlert(
+                conversation=spec['conversation'],
+                alert_type=alert_type,
+                priority=spec['priority'],
+                priority_rank=rank,
+                reason=spec.get('reason') or f"Conversation requires human attention ({alert_type})",
+                trigger_message=spec.get('trigger_message', '')[:200]
+            ))
+        elif rank > alert.priority_rank:
+            alert.priority = spec['priority']
+            alert.priority_rank = rank
+            upgrades.append(alert)
+    
+    # All or nothing, so a batch that hits one_unresolved_per_conversation
+    # (a concurrent online handoff) can simply be re-run
+    with transaction.atomic():
+        HandoffAlert.objects.bulk_create(new_alerts, batch_size=batch_size)
+        HandoffAlert.objects.bulk_update(upgrades, ['priority', 'priority_rank'], batch_size=batch_size)
+    
+    # Bulk writes skip the post_save receiver
+    touched = {spec['conversation'].organization_id for spec in specs.values()}
+    for org_id in touched:
+        invalidate_stats_cache(org_id)
+    
+    logger.info(f"🚨 Bulk handoff alerts: {len(new_alerts)} created, {len(upgrades)} upgraded")
+    return {'created': len(new_alerts), 'upgraded': len(upgrades)}
+
+
+def resolve_conversation_alerts(conversation, user, notes: str = "") -> int:
+    """
+    Resolve every unresolved alert of a conversation in a single UPDATE,
+    acknowledging (as user) those not yet acknowledged, like HandoffAlert.resolve.
+
+    Returns:
+        Number of alerts resolved
+    """
+    now = timezone.now()
+    resolved = HandoffAlert.objects.filter(
+        conversation=conversation,
+        is_resolved=False
+    ).update(
+        is_resolved=True,
+        resolved_by=user,
+        resolved_at=now,
+        resolution_notes=notes,
+        is_acknowledged=True,
+        acknowledged_by=Case(
+            When(is_acknowledged=True, then=F('acknowledged_by')),
+            default=Value(user.pk)
+        ),
+        acknowledged_at=Case(
+            When(is_acknowledged=True, then=F('acknowledged_at')),
+            default=Value(now)
+        ),
+    )
+    if resolved:
+        # Queryset updates skip the post_save receiver
+        invalidate_stats_cache(conversation.organization_id)
+    return resolved
+
+
 def create_alert_from_ai_response(conversation, ai_response: dict, user_message: str = "") -> Optional[HandoffAlert]:
     """
     Create a handoff alert based on AI response.
@@ -85,16 +228,7 @@ def create_alert_from_ai_response(conversation, ai_response: dict, user_message:
     intent = ai_response.get('intent', 'unknown')
     
     # Determine alert type based on handoff reason
-    alert_type_map = {
-        'low_confidence': HandoffAlert.AlertType.LOW_CONFIDENCE,
-        'ai_requested': HandoffAlert.AlertType.ESCALATION_REQUEST,
-        'ai_error': HandoffAlert.AlertType.OTHER,
-        'no_api_key': HandoffAlert.AlertType.OTHER,
-        'explicit_request': HandoffAlert.AlertType.ESCALATION_REQUEST,
-        'complaint': HandoffAlert.AlertType.COMPLAINT,
-    }
-    
-    alert_type = alert_type_map.get(handoff_reason, HandoffAlert.AlertType.OTHER)
+    alert_type = _ALERT_TYPE_BY_REASON.get(handoff_reason, HandoffAlert.AlertType.OTHER)
     
     # Determine priority based on confidence and intent
     if confidence < 0.3 or handoff_reason in ['ai_error', 'complaint']:
@@ -142,11 +276,11 @@ def create_alert_for_manual_handoff(conversation, locked_by_user=None) -> Option
     
     # Get the last customer message as trigger
     from apps.messaging.models import MessageSender
-    last_customer_msg = conversation.messages.filter(
+    last_customer_content = conversation.messages.filter(
         sender=MessageSender.CUSTOMER
-    ).order_by('-created_at').first()
+    ).order_by('-created_at').values_list('content', flat=True).first()
     
-    trigger_message = last_customer_msg.content if last_customer_msg else ""
+    trigger_message = last_customer_content or ""
     
     return create_handoff_alert(
         conversation=conversation,
@@ -0,0 +1,17 @@
+"""
+Handoff alert signal receivers.
+
+Drop the organization's cached alert stats (see HandoffAlertViewSet.stats)
+whenever one of its alerts is saved or deleted.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import HandoffAlert
+from .services import invalidate_stats_cache
+
+
+@receiver(post_save, sender=HandoffAlert)
+@receiver(post_delete, sender=HandoffAlert)
+def invalidate_alert_stats(sender, instance, **kwargs):
+    invalidate_stats_cache(instance.conversation.organization_id)
@@ -0,0 +1,245 @@
+"""
+Tests for handoff alerts.
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Organization, OrganizationMembership, User
+from apps.messaging.models import Conversation, Message, Channel, MessageSender
+from apps.handoff.models import HandoffAlert
+from apps.handoff.serializers import HandoffAlertSerializer
+from apps.handoff.services import (
+    create_handoff_alert, create_handoff_alerts_bulk, resolve_conversation_alerts,
+)
+
+
+class HandoffAlertListTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Alert Org")
+        self.user = User.objects.create_user(
+            email="alerts@test.test", username="alerts", password="pw",
+            first_name="Ada", last_name="Agent",
+        )
+        OrganizationMembership.objects.create(
+            user=self.user, organization=self.org,
+            role=OrganizationMembership.Role.OWNER,
+        )
+        self.conversations = []
+        for i in range(3):
+            conversation = Conversation.objects.create(
+                organization=self.org, channel=Channel.WHATSAPP,
+                customer_name=f"Cust {i}", customer_phone=f"1555000000{i}",
+            )
+            Message.objects.create(
+                conversation=conversation, sender=MessageSender.CUSTOMER, content=f"help {i}",
+            )
+            self.conversations.append(conversation)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_trigger_message_without_n_plus_one(self):
+        for conversation in self.conversations:
+            HandoffAlert.objects.create(conversation=conversation, reason="AI flagged")
+        with self.assertNumQueries(3) as ctx:  # memberships + count + page
+            response = self.client.get("/api/handoff/alerts/")
+        self.assertEqual(response.status_code, 200)
+        page_sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn("resolution_notes", page_sql)
+        self.assertNotIn("customer_metadata", page_sql)
+        self.assertNotIn("resolution_notes", response.data["results"][0])
+        self.assertEqual(
+            {r["trigger_message"] for r in response.data["results"]},
+            {"help 0", "help 1", "help 2"},
+        )
+
+    def test_status_annotated(self):
+        HandoffAlert.objects.create(conversation=self.conversations[0], reason="a")
+        HandoffAlert.objects.create(
+            conversation=self.conversations[1], reason="b", is_acknowledged=True,
+        )
+        response = self.client.get("/api/handoff/alerts/")
+        statuses = {r["conversation_customer_name"]: r["status"] for r in response.data["results"]}
+        self.assertEqual(statuses, {"Cust 0": "pending", "Cust 1": "acknowledged"})
+
+        alert = HandoffAlert.objects.get(conversation=self.conversations[0])
+        with self.assertNumQueries(3):  # memberships + fetch + UPDATE
+            response = self.client.post(f"/api/handoff/alerts/{alert.id}/acknowledge/")
+        self.assertEqual(response.data["trigger_message"], "help 0")
+        self.assertEqual(response.data["status"], "acknowledged")
+        response = self.client.post(f"/api/handoff/alerts/{alert.id}/resolve/")
+        self.assertEqual(response.data["status"], "resolved")
+        self.assertEqual(response.data["acknowledged_by_name"], "Ada Agent")
+        self.assertEqual(response.data["resolved_by_name"], "Ada Agent")
+
+        response = self.client.get("/api/handoff/alerts/", {"status": "resolved"})
+        [row] = response.data["results"]
+        self.assertEqual(row["resolved_by_name"], "Ada Agent")
+        self.assertIsNone(
+            self.client.get("/api/handoff/alerts/", {"status": "acknowledged"})
+            .data["results"][0]["acknowledged_by_name"]
+        )
+
+    def test_stats_single_query(self):
+        HandoffAlert.objects.create(conversation=self.conversations[0], reason="a", priority="urgent")
+        HandoffAlert.objects.create(
+            conversation=self.conversations[1], reason="b", priority="low", is_acknowledged=True,
+        )
+        HandoffAlert.objects.create(conversation=self.conversations[2], reason="c", is_resolved=True)
+        HandoffAlert.objects.create(
+            conversation=self.conversations[2], reason="d", is_resolved=True,
+            resolved_at=timezone.now() - timedelta(days=2),
+        )
+        HandoffAlert.objects.create(
+            conversation=self.conversations[2], reason="e", is_resolved=True,
+            resolved_at=timezone.now(),
+        )
+        with self.assertNumQueries(2):  # memberships + aggregate
+            response = self.client.get("/api/handoff/alerts/stats/")
+        self.assertEqual(response.data, {
+            "total": 5,
+            "pending": 2,
+            "acknowledged": 1,
+            "resolved_today": 1,
+            "by_priority": {"urgent": 1, "high": 0, "medium": 0, "low": 1},
+        })
+
+    def test_order_by_severity(self):
+        for conversation, priority in zip(self.conversations, ["high", "urgent", "low"]):
+            HandoffAlert.objects.create(conversation=conversation, reason="a", priority=priority)
+        response = self.client.get(
+            "/api/handoff/alerts/", {"status": "pending", "ordering": "-priority_rank,-created_at"},
+        )
+        self.assertEqual([r["priority"] for r in response.data["results"]], ["urgent", "high", "low"])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_stats_cached_per_org_until_alert_changes(self):
+        alert = HandoffAlert.objects.create(conversation=self.conversations[0], reason="a")
+        with self.assertNumQueries(2):  # memberships + grouped counts
+            self.client.get("/api/handoff/alerts/stats/")
+        with self.assertNumQueries(0):  # org ids and counts both cached
+            response = self.client.get("/api/handoff/alerts/stats/")
+        self.assertEqual(response.data["pending"], 1)
+
+        alert.resolve(self.user)
+        response = self.client.get("/api/handoff/alerts/stats/")
+        self.assertEqual(response.data["pending"], 0)
+        self.assertEqual(response.data["resolved_today"], 1)
+
+        create_handoff_alert(self.conversations[1], priority="low")
+        create_handoff_alert(self.conversations[1], priority="urgent")
+        response = self.client.get("/api/handoff/alerts/stats/")
+        self.assertEqual(response.data["by_priority"]["urgent"], 1)
+        self.assertEqual(response.data["by_priority"]["low"], 0)
+
+        other_org = Organization.objects.create(name="Other Org")
+        response = self.client.get("/api/handoff/alerts/stats/", {"organization": str(other_org.id)})
+        self.assertEqual(response.data["total"], 0)
+
+    def test_org_ids_looked_up_once_per_request(self):
+        alert = HandoffAlert.objects.create(conversation=self.conversations[0], reason="a")
+        with self.assertNumQueries(3):  # memberships + fetch + one UPDATE
+            response = self.client.post(f"/api/handoff/alerts/{alert.id}/resolve/")
+        self.assertEqual(response.status_code, 200)
+        alert.refresh_from_db()
+        self.assertTrue(alert.is_resolved)
+        self.assertEqual(alert.acknowledged_by, self.user)
+        self.assertEqual(alert.acknowledged_at, alert.resolved_at)
+
+
+class CreateHandoffAlertTest(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Service Org")
+        self.conversation = Conversation.objects.create(
+            organization=org, channel=Channel.WHATSAPP, customer_phone="15550009999",
+        )
+
+    def test_existing_alert_priority_only_raised(self):
+        alert = create_handoff_alert(self.conversation, priority="medium", reason="first")
+        with self.assertNumQueries(2):  # lookup + conditional UPDATE
+            again = create_handoff_alert(self.conversation, priority="urgent")
+        self.assertEqual(again.pk, alert.pk)
+        self.assertEqual(again.priority, "urgent")
+
+        with self.assertNumQueries(1):  # lookup only
+            again = create_handoff_alert(self.conversation, priority="low")
+        self.assertEqual(again.priority, "urgent")
+        alert.refresh_from_db()
+        self.assertEqual(alert.priority, "urgent")
+        self.assertEqual(HandoffAlert.objects.count(), 1)
+
+    def test_priority_rank_follows_priority(self):
+        alert = create_handoff_alert(self.conversation, priority="high", reason="first")
+        self.assertEqual(alert.priority_rank, 3)
+        alert.priority = "low"
+        alert.save(update_fields=["priority"])
+        alert.refresh_from_db()
+        self.assertEqual(alert.priority_rank, 1)
+
+    def test_trigger_message_stored_on_column(self):
+        alert = create_handoff_alert(
+            self.conversation, reason="AI flagged", trigger_message="x" * 300,
+        )
+        alert.refresh_from_db()
+        self.assertEqual(alert.reason, "AI flagged")
+        self.assertEqual(alert.trigger_message, "x" * 200)
+        self.assertEqual(HandoffAlertSerializer(alert).data["trigger_message"], "x" * 200)
+
+    def test_one_unresolved_alert_per_conversation(self):
+        create_handoff_alert(self.conversation, reason="first")
+        with self.assertRaises(IntegrityError):
+            HandoffAlert.objects.create(conversation=self.conversation, reason="dup")
+
+    def test_lost_create_race_returns_existing_alert(self):
+        winner = HandoffAlert.objects.create(conversation=self.conversation, reason="winner")
+        # The lookup misses the winner's row, as if it committed just after
+        with mock.patch("django.db.models.query.QuerySet.first", side_effect=[None, winner]):
+            alert = create_handoff_alert(self.conversation, priority="low", reason="loser")
+        self.assertEqual(alert.pk, winner.pk)
+        self.assertEqual(HandoffAlert.objects.count(), 1)
+
+    def test_resolve_conversation_alerts_in_one_update(self):
+        user = User.objects.create_user(email="res@test.test", username="res", password="pw")
+        alert = create_handoff_alert(self.conversation, reason="first")
+        with self.assertNumQueries(1):
+            resolved = resolve_conversation_alerts(self.conversation, user, notes="done")
+        self.assertEqual(resolved, 1)
+        alert.refresh_from_db()
+        self.assertTrue(alert.is_resolved and alert.is_acknowledged)
+        self.assertEqual(alert.resolved_by, user)
+        self.assertEqual(alert.acknowledged_by, user)
+        self.assertEqual(alert.acknowledged_at, alert.resolved_at)
+        self.assertEqual(alert.resolution_notes, "done")
+
+        other = User.objects.create_user(email="ack@test.test", username="ack", password="pw")
+        alert = create_handoff_alert(self.conversation, reason="second")
+        alert.acknowledge(other)
+        resolve_conversation_alerts(self.conversation, user)
+        alert.refresh_from_db()
+        self.assertEqual(alert.acknowledged_by, other)
+        self.assertLess(alert.acknowledged_at, alert.resolved_at)
+
+    def test_bulk_create_and_upgrade(self):
+        existing = create_handoff_alert(self.conversation, priority="low", reason="first")
+        others = [
+            Conversation.objects.create(
+                organization=self.conversation.organization, channel=Channel.WEBSITE,
+            )
+            for _ in range(3)
+        ]
+        specs = [{"conversation": self.conversation, "priority": "high"}] + [
+            {"conversation": c, "priority": "urgent", "trigger_message": "hi"} for c in others
+        ] + [{"conversation": others[0], "priority": "low"}]
+        # lookup + savepoint + INSERT + UPDATE + release
+        with self.assertNumQueries(5):
+            result = create_handoff_alerts_bulk(specs)
+        self.assertEqual(result, {"created": 3, "upgraded": 1})
+        existing.refresh_from_db()
+        self.assertEqual((existing.priority, existing.priority_rank), ("high", 3))
+        alert = HandoffAlert.objects.get(conversation=others[0])
+        self.assertEqual((alert.priority, alert.priority_rank), ("urgent", 4))
+        self.assertEqual(alert.trigger_message, "hi")
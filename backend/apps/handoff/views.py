@@ -1,33 +1,61 @@
 """
 Handoff views for alerts and escalations.
 """
+import logging
+from collections import Counter
+
+from django.core.cache import cache
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Case, CharField, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Concat, Substr
 from django.utils import timezone
 
 from .models import HandoffAlert, EscalationRule
-from .serializers import HandoffAlertSerializer, EscalationRuleSerializer
+from .services import STATS_CACHE_TTL, stats_cache_key
+from .serializers import (
+    HandoffAlertSerializer, HandoffAlertListSerializer, EscalationRuleSerializer
+)
 from apps.accounts.models import OrganizationMembership
+from apps.common.mixins import UserOrgIdsMixin
+from apps.messaging.models import Message, MessageSender
+
+logger = logging.getLogger(__name__)
+
 
+def _full_name(user):
+    """Name in the same form as the ack/res_full_name annotations."""
+    return f"{user.first_name} {user.last_name}" if user else None
 
-class HandoffAlertViewSet(viewsets.ModelViewSet):
+
+class HandoffAlertViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing handoff alerts.
     """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = HandoffAlertSerializer
+    # priority_rank sorts by severity; priority itself would sort alphabetically
+    ordering_fields = ['created_at', 'priority_rank', 'acknowledged_at', 'resolved_at']
+    # Columns the list serializer reads; of the conversation only the two
+    # it shows, not its metadata/summary columns
+    list_only_fields = (
+        'id', 'conversation', 'conversation__customer_name', 'conversation__channel',
+        'alert_type', 'priority', 'reason', 'trigger_message',
+        'is_acknowledged', 'acknowledged_by', 'acknowledged_at',
+        'is_resolved', 'resolved_by', 'resolved_at', 'created_at',
+    )
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return HandoffAlertListSerializer
+        return HandoffAlertSerializer
 
     def get_queryset(self):
         """Return alerts for user's organizations."""
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
-
         queryset = HandoffAlert.objects.filter(
-            conversation__organization_id__in=org_ids
-        ).select_related('conversation', 'acknowledged_by', 'resolved_by')
+            conversation__organization_id__in=self._user_org_ids()
+        )
 
         # Filter by organization
         org_id = self.request.query_params.get('organization')
@@ -48,14 +76,52 @@ class HandoffAlertViewSet(viewsets.ModelViewSet):
         if priority:
             queryset = queryset.filter(priority=priority)
 
-        return queryset
+        # stats only counts rows; skip the joins and per-row annotations
+        if self.action == 'stats':
+            return queryset
+
+        # The latest customer message (trigger_message fallback) comes in as a
+        # correlated subquery, so serializing a page costs no extra queries
+        last_customer_message = Message.objects.filter(
+            conversation=OuterRef('conversation'),
+            sender=MessageSender.CUSTOMER
+        ).order_by('-created_at').annotate(
+            snippet=Substr('content', 1, 200)
+        ).values('snippet')[:1]
+
+        queryset = queryset.select_related('conversation')
+        if self.action == 'list':
+            queryset = queryset.only(*self.list_only_fields)
+
+        # Only the users' names are serialized, so they are concatenated in
+        # the query instead of joining in whole user rows
+        return queryset.annotate(
+            ack_full_name=Concat(
+                'acknowledged_by__first_name', Value(' '), 'acknowledged_by__last_name'
+            ),
+            res_full_name=Concat(
+                'resolved_by__first_name', Value(' '), 'resolved_by__last_name'
+            ),
+            last_customer_message=Subquery(last_customer_message),
+            status=Case(
+                When(is_resolved=True, then=Value('resolved')),
+                When(is_acknowledged=True, then=Value('acknowledged')),
+                default=Value('pending'),
+                output_field=CharField()
+            )
+        )
 
     @action(detail=True, methods=['post'])
     def acknowledge(self, request, pk=None):
-        """Acknowledge an alert."""
+        """
+        Acknowledge an alert. The alert comes from get_queryset() with its
+        joins and annotations, so the response needs no further queries.
+        """
         alert = self.get_object()
         alert.acknowledge(request.user)
-        return Response(HandoffAlertSerializer(alert).data)
+        alert.status = 'resolved' if alert.is_resolved else 'acknowledged'
+        alert.ack_full_name = _full_name(alert.acknowledged_by)
+        return Response(self.get_serializer(alert).data)
 
     @action(detail=True, methods=['post'])
     def resolve(self, request, pk=None):
@@ -63,25 +129,88 @@ class HandoffAlertViewSet(viewsets.ModelViewSet):
         alert = self.get_object()
         notes = request.data.get('notes', '')
         alert.resolve(request.user, notes)
-        return Response(HandoffAlertSerializer(alert).data)
+        alert.status = 'resolved'
+        alert.ack_full_name = _full_name(alert.acknowledged_by)
+        alert.res_full_name = _full_name(alert.resolved_by)
+        return Response(self.get_serializer(alert).data)
+
+    def _stats_aggregates(self):
+        """Counts reported by stats(), as aggregate() keyword arguments."""
+        unresolved = Q(is_resolved=False)
+        # A range from local midnight rather than resolved_at__date, which
+        # would convert and truncate every row's timestamp
+        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        return {
+            'total': Count('id'),
+            'pending': Count('id', filter=unresolved),
+            'acknowledged': Count('id', filter=Q(is_acknowledged=True, is_resolved=False)),
+            'resolved_today': Count('id', filter=Q(
+                is_resolved=True,
+                resolved_at__gte=today_start
+            )),
+            'urgent': Count('id', filter=unresolved & Q(priority='urgent')),
+            'high': Count('id', filter=unresolved & Q(priority='high')),
+            'medium': Count('id', filter=unresolved & Q(priority='medium')),
+            'low': Count('id', filter=unresolved & Q(priority='low')),
+        }
+
+    def _cached_org_stats(self):
+        """
+        Sum of per-organization counts, each cached for STATS_CACHE_TTL and
+        dropped whenever one of the org's alerts changes (see signals.py).
+        Orgs missing from the cache are counted in one GROUP BY query.
+        """
+        org_id = self.request.query_params.get('organization')
+        keys = {
+            stats_cache_key(user_org_id): user_org_id
+            for user_org_id in self._user_org_ids()
+            if not org_id or str(user_org_id) == org_id
+        }
+        try:
+            cached = cache.get_many(keys)
+        except Exception:
+            logger.warning('Handoff stats cache unavailable; counting from the database')
+            cached = {}
+
+        missing = [user_org_id for key, user_org_id in keys.items() if key not in cached]
+        if missing:
+            aggregates = self._stats_aggregates()
+            fresh = {user_org_id: dict.fromkeys(aggregates, 0) for user_org_id in missing}
+            rows = HandoffAlert.objects.filter(
+                conversation__organization_id__in=missing
+            ).order_by().values('conversation__organization_id').annotate(**aggregates)
+            for row in rows:
+                fresh[row.pop('conversation__organization_id')] = row
+            fresh = {stats_cache_key(user_org_id): counts for user_org_id, counts in fresh.items()}
+            try:
+                cache.set_many(fresh, STATS_CACHE_TTL)
+            except Exception:
+                logger.warning('Could not cache handoff stats')
+            cached.update(fresh)
+
+        totals = Counter()
+        for counts in cached.values():
+            totals.update(counts)
+        return totals
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get alert statistics."""
-        queryset = self.get_queryset()
+        if request.query_params.get('status') or request.query_params.get('priority'):
+            # Filtered views are rare; only the plain per-org stats are cached
+            counts = self.get_queryset().aggregate(**self._stats_aggregates())
+        else:
+            counts = self._cached_org_stats()
         return Response({
-            'total': queryset.count(),
-            'pending': queryset.filter(is_resolved=False).count(),
-            'acknowledged': queryset.filter(is_acknowledged=True, is_resolved=False).count(),
-            'resolved_today': queryset.filter(
-                is_resolved=True,
-                resolved_at__date=timezone.now().date()
-            ).count(),
+            'total': counts['total'],
+            'pending': counts['pending'],
+            'acknowledged': counts['acknowledged'],
+            'resolved_today': counts['resolved_today'],
             'by_priority': {
-                'urgent': queryset.filter(priority='urgent', is_resolved=False).count(),
-                'high': queryset.filter(priority='high', is_resolved=False).count(),
-                'medium': queryset.filter(priority='medium', is_resolved=False).count(),
-                'low': queryset.filter(priority='low', is_resolved=False).count(),
+                'urgent': counts['urgent'],
+                'high': counts['high'],
+                'medium': counts['medium'],
+                'low': counts['low'],
             }
         })
 
@@ -93,14 +222,20 @@ class EscalationRuleViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = EscalationRuleSerializer
 
-    def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user,
-            role=OrganizationMembership.Role.OWNER
-        ).values_list('organization_id', flat=True)
+    def _owner_org_ids(self):
+        """Orgs the user owns, looked up once per request."""
+        org_ids = getattr(self.request, '_owner_org_ids', None)
+        if org_ids is None:
+            org_ids = self.request._owner_org_ids = tuple(
+                OrganizationMembership.objects.filter(
+                    user=self.request.user,
+                    role=OrganizationMembership.Role.OWNER
+                ).values_list('organization_id', flat=True)
+            )
+        return org_ids
 
-        return EscalationRule.objects.filter(organization_id__in=org_ids)
+    def get_queryset(self):
+        return EscalationRule.objects.filter(organization_id__in=self._owner_org_ids())
 
     def perform_create(self, serializer):
         org_id = self.request.data.get('organization')
@@ -16,7 +16,7 @@ class KnowledgeBaseAdmin(admin.ModelAdmin):
 @admin.register(FAQ)
 class FAQAdmin(admin.ModelAdmin):
     list_display = ['question_preview', 'knowledge_base', 'order', 'is_active']
-    list_filter = ['knowledge_base__organization', 'is_active']
+    list_filter = ['organization', 'is_active']
     search_fields = ['question', 'answer']
     raw_id_fields = ['knowledge_base']
 
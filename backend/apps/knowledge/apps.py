@@ -5,3 +5,6 @@ class KnowledgeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.knowledge'
     verbose_name = 'Knowledge Base'
+
+    def ready(self):
+        from . import signals  # noqa: F401
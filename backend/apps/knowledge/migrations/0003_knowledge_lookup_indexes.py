@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("knowledge", "0002_remove_knowledgebase_unique_org_location_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="faq",
+            index=models.Index(
+                fields=["knowledge_base", "order", "-created_at"],
+                name="faq_kb_order_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="faq",
+            index=models.Index(
+                fields=["knowledge_base", "is_active", "order"],
+                name="faq_kb_active_order_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="knowledgebase",
+            index=models.Index(
+                condition=models.Q(("location__isnull", True)),
+                fields=["organization"],
+                name="kb_org_only_idx",
+            ),
+        ),
+    ]
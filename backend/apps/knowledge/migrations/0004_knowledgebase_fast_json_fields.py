@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:58
+
+import apps.common.db
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("knowledge", "0003_knowledge_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="knowledgebase",
+            name="contact_info",
+            field=apps.common.db.FastJSONField(
+                blank=True,
+                default=dict,
+                help_text="Contact details (phone, email, address, etc.)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="knowledgebase",
+            name="opening_hours",
+            field=apps.common.db.FastJSONField(
+                blank=True,
+                default=dict,
+                help_text="Opening hours for each day of the week",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="knowledgebase",
+            name="policies",
+            field=apps.common.db.FastJSONField(
+                blank=True,
+                default=dict,
+                help_text="Business policies (cancellation, refund, etc.)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="knowledgebase",
+            name="services",
+            field=apps.common.db.FastJSONField(
+                blank=True, default=list, help_text="List of services offered"
+            ),
+        ),
+    ]
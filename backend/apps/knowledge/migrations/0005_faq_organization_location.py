@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_from_knowledge_base(apps, schema_editor):
+    FAQ = apps.get_model("knowledge", "FAQ")
+    KnowledgeBase = apps.get_model("knowledge", "KnowledgeBase")
+    kb = KnowledgeBase.objects.filter(pk=models.OuterRef("knowledge_base_id"))
+    FAQ.objects.update(
+        organization_id=models.Subquery(kb.values("organization_id")[:1]),
+        location_id=models.Subquery(kb.values("location_id")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("knowledge", "0004_knowledgebase_fast_json_fields"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="faq",
+            name="organization",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="faqs",
+                to="accounts.organization",
+            ),
+        ),
+        migrations.AddField(
+            model_name="faq",
+            name="location",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="faqs",
+                to="accounts.location",
+            ),
+        ),
+        migrations.RunPython(copy_from_knowledge_base, migrations.RunPython.noop),
+    ]
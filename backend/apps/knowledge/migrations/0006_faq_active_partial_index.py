@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("knowledge", "0005_faq_organization_location"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="faq",
+            name="faq_kb_active_order_idx",
+        ),
+        migrations.AddIndex(
+            model_name="faq",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["knowledge_base", "order"],
+                name="faq_active_idx",
+            ),
+        ),
+    ]
@@ -4,6 +4,7 @@ Knowledge Base models - Business profile, FAQs, location overrides.
 import uuid
 from django.db import models
 from apps.accounts.models import Organization, Location
+from apps.common.db import FastJSONField
 
 
 class KnowledgeBase(models.Model):
@@ -33,21 +34,21 @@ class KnowledgeBase(models.Model):
     )
 
     # Opening Hours (JSON: {"monday": {"open": "09:00", "close": "17:00"}, ...})
-    opening_hours = models.JSONField(
+    opening_hours = FastJSONField(
         default=dict,
         blank=True,
         help_text='Opening hours for each day of the week'
     )
 
     # Contact Information
-    contact_info = models.JSONField(
+    contact_info = FastJSONField(
         default=dict,
         blank=True,
         help_text='Contact details (phone, email, address, etc.)'
     )
 
     # Services/Offerings
-    services = models.JSONField(
+    services = FastJSONField(
         default=list,
         blank=True,
         help_text='List of services offered'
@@ -60,7 +61,7 @@ class KnowledgeBase(models.Model):
     )
 
     # Policies
-    policies = models.JSONField(
+    policies = FastJSONField(
         default=dict,
         blank=True,
         help_text='Business policies (cancellation, refund, etc.)'
@@ -73,6 +74,24 @@ class KnowledgeBase(models.Model):
         db_table = 'knowledge_bases'
         unique_together = ['organization', 'location']
         ordering = ['organization', 'location']
+        indexes = [
+            # The org-level KB (no location) the AI context looks up per message
+            models.Index(
+                fields=['organization'],
+                condition=models.Q(location__isnull=True),
+                name='kb_org_only_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if not adding and (update_fields is None or {'organization', 'location'} & set(update_fields)):
+            # Keep the FAQs' copies in step when the KB is moved
+            self.faqs.exclude(
+                organization_id=self.organization_id, location_id=self.location_id
+            ).update(organization_id=self.organization_id, location_id=self.location_id)
 
     def __str__(self):
         if self.location:
@@ -80,6 +99,41 @@ class KnowledgeBase(models.Model):
         return f"Knowledge: {self.organization.name} (Organization Level)"
 
 
+class FAQQuerySet(models.QuerySet):
+    def active(self):
+        """FAQs shown to customers (served by the faq_active_idx partial index)."""
+        return self.filter(is_active=True)
+
+    # FAQs inserted by pods older than the organization/location copies have
+    # them NULL until they are backfilled; the two filters below match those
+    # rows through their knowledge base (a subquery, not a join) meanwhile
+
+    def for_organizations(self, org_ids):
+        """FAQs of the organizations in org_ids."""
+        return self.filter(
+            models.Q(organization_id__in=org_ids)
+            | models.Q(
+                organization__isnull=True,
+                knowledge_base__in=KnowledgeBase.objects.filter(organization_id__in=org_ids),
+            )
+        )
+
+    def for_location(self, location_id):
+        """FAQs of location_id plus the organization-wide ones."""
+        return self.filter(
+            models.Q(
+                models.Q(location_id=location_id) | models.Q(location__isnull=True),
+                organization__isnull=False,
+            )
+            | models.Q(
+                organization__isnull=True,
+                knowledge_base__in=KnowledgeBase.objects.filter(
+                    models.Q(location_id=location_id) | models.Q(location__isnull=True)
+                ),
+            )
+        )
+
+
 class FAQ(models.Model):
     """
     Frequently Asked Questions.
@@ -91,6 +145,27 @@ class FAQ(models.Model):
         on_delete=models.CASCADE,
         related_name='faqs'
     )
+    # Copies of knowledge_base.organization/location (kept in step by
+    # save() here and in KnowledgeBase), so org-scoped FAQ queries need no
+    # join. Nullable for this release only: pods from before the column
+    # existed still insert FAQs during a rolling update (FAQQuerySet's
+    # filters still find those rows); a later release backfills them and
+    # adds the NOT NULL
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='faqs',
+        editable=False
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='faqs',
+        editable=False
+    )
 
     question = models.TextField()
     answer = models.TextField()
@@ -102,21 +177,31 @@ class FAQ(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = FAQQuerySet.as_manager()
+
     class Meta:
         db_table = 'faqs'
         ordering = ['order', '-created_at']
+        indexes = [
+            # A KB's FAQs in display order, all or active only
+            models.Index(fields=['knowledge_base', 'order', '-created_at'], name='faq_kb_order_idx'),
+            models.Index(
+                fields=['knowledge_base', 'order'],
+                condition=models.Q(is_active=True),
+                name='faq_active_idx',
+            ),
+        ]
         verbose_name = 'FAQ'
         verbose_name_plural = 'FAQs'
 
     def __str__(self):
         return f"FAQ: {self.question[:50]}..."
-    
-    @property
-    def organization(self):
-        """Get organization from knowledge base."""
-        return self.knowledge_base.organization
-    
-    @property
-    def location(self):
-        """Get location from knowledge base."""
-        return self.knowledge_base.location
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'knowledge_base' in update_fields:
+            self.organization_id = self.knowledge_base.organization_id
+            self.location_id = self.knowledge_base.location_id
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'organization', 'location']
+        super().save(*args, **kwargs)
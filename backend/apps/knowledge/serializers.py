@@ -1,13 +1,16 @@
 """
 Knowledge base serializers.
 """
+from django.db import models
 from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+
 from .models import KnowledgeBase, FAQ
 
 
 class KnowledgeBaseSerializer(serializers.ModelSerializer):
     """Serializer for KnowledgeBase."""
-    location_name = serializers.SerializerMethodField()
+    location_name = serializers.CharField(source='location.name', read_only=True, allow_null=True)
 
     class Meta:
         model = KnowledgeBase
@@ -19,9 +22,6 @@ class KnowledgeBaseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-    def get_location_name(self, obj):
-        return obj.location.name if obj.location else None
-
 
 class KnowledgeBaseCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating knowledge base."""
@@ -34,10 +34,35 @@ class KnowledgeBaseCreateSerializer(serializers.ModelSerializer):
         ]
 
 
+class FAQListSerializer(serializers.ListSerializer):
+    """
+    FAQSerializer(many=True) output, but each field's getter and formatter
+    is looked up once for the whole list rather than once per FAQ; FAQ
+    lists are long and every field is a flat column.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        fields = [
+            (field.field_name, field.get_attribute, field.to_representation)
+            for field in self.child._readable_fields
+        ]
+        rows = []
+        for instance in iterable:
+            row = {}
+            for name, get_attribute, to_representation in fields:
+                attribute = get_attribute(instance)
+                check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+                row[name] = None if check_for_none is None else to_representation(attribute)
+            rows.append(row)
+        return rows
+
+
 class FAQSerializer(serializers.ModelSerializer):
     """Serializer for FAQ."""
-    organization = serializers.SerializerMethodField()
-    location = serializers.SerializerMethodField()
+    # The FK id columns; no organization/location rows needed
+    organization = serializers.UUIDField(source='organization_id', read_only=True)
+    location = serializers.UUIDField(source='location_id', read_only=True, allow_null=True)
 
     class Meta:
         model = FAQ
@@ -47,16 +72,16 @@ class FAQSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'organization', 'location', 'created_at', 'updated_at']
-
-    def get_organization(self, obj):
-        return str(obj.knowledge_base.organization.id)
-    
-    def get_location(self, obj):
-        return str(obj.knowledge_base.location.id) if obj.knowledge_base.location else None
+        list_serializer_class = FAQListSerializer
 
 
 class FAQCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating FAQ."""
+    # Only the ids are needed for the membership check and the insert
+    # (which copies organization/location onto the FAQ)
+    knowledge_base = serializers.PrimaryKeyRelatedField(
+        queryset=KnowledgeBase.objects.only('id', 'organization', 'location')
+    )
 
     class Meta:
         model = FAQ
@@ -0,0 +1,78 @@
+"""
+Knowledge base services.
+
+The AI engine reads an organization's knowledge (KB profile + FAQs) on every
+conversation turn, while it changes only when someone edits it in the
+dashboard. get_knowledge_snapshot() caches that read as plain dicts per
+(organization, location); the KnowledgeBase/FAQ signal receivers drop an
+organization's snapshots on any change (see signals.py). A cache outage
+falls back to the database.
+"""
+import logging
+
+from django.core.cache import cache
+from apps.accounts.models import Location
+from .models import KnowledgeBase, FAQ
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_CACHE_TTL = 3600
+
+# FAQs included in the AI context
+SNAPSHOT_FAQ_LIMIT = 20
+
+# KnowledgeBase columns the AI context uses
+SNAPSHOT_KB_FIELDS = ('business_description', 'opening_hours', 'contact_info', 'additional_info')
+
+
+def knowledge_cache_key(org_id, location_id=None) -> str:
+    return f'kb:{org_id}:{location_id or "org"}'
+
+
+def _build_snapshot(org_id, location_id=None) -> dict:
+    def kb_values(location_id):
+        return KnowledgeBase.objects.filter(
+            organization_id=org_id,
+            location_id=location_id
+        ).values(*SNAPSHOT_KB_FIELDS).first()
+
+    faqs = FAQ.objects.active().for_organizations([org_id])
+    if location_id:
+        faqs = faqs.for_location(location_id)
+
+    return {
+        'location_kb': kb_values(location_id) if location_id else None,
+        'org_kb': kb_values(None),
+        'faqs': list(faqs.values_list('question', 'answer')[:SNAPSHOT_FAQ_LIMIT]),
+    }
+
+
+def get_knowledge_snapshot(org_id, location_id=None) -> dict:
+    """
+    Knowledge for the AI context of a conversation at location_id (or the
+    organization as a whole):
+
+        {'location_kb': {...} | None, 'org_kb': {...} | None,
+         'faqs': [(question, answer), ...]}
+    """
+    key = knowledge_cache_key(org_id, location_id)
+    try:
+        return cache.get_or_set(key, lambda: _build_snapshot(org_id, location_id), KNOWLEDGE_CACHE_TTL)
+    except Exception:
+        logger.warning('Knowledge cache unavailable; reading org=%s from the database', org_id)
+    return _build_snapshot(org_id, location_id)
+
+
+def invalidate_knowledge_cache(org_id) -> None:
+    """
+    Drop every snapshot of an organization: location snapshots embed the
+    org-level KB and FAQs, so any change can affect all of them.
+    """
+    location_ids = Location.objects.filter(organization_id=org_id).values_list('id', flat=True)
+    keys = [knowledge_cache_key(org_id)] + [
+        knowledge_cache_key(org_id, location_id) for location_id in location_ids
+    ]
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        logger.warning('Could not invalidate knowledge cache for org=%s', org_id)
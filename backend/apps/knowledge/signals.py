@@ -0,0 +1,23 @@
+"""
+Knowledge signal receivers.
+
+Drop the organization's cached knowledge snapshots (see
+services.get_knowledge_snapshot) whenever a knowledge base or FAQ changes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import KnowledgeBase, FAQ
+from .services import invalidate_knowledge_cache
+
+
+@receiver(post_save, sender=KnowledgeBase)
+@receiver(post_delete, sender=KnowledgeBase)
+def invalidate_knowledge_base_snapshots(sender, instance, **kwargs):
+    invalidate_knowledge_cache(instance.organization_id)
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def invalidate_faq_snapshots(sender, instance, **kwargs):
+    invalidate_knowledge_cache(instance.organization_id)
@@ -0,0 +1,234 @@
+"""
+Tests for knowledge bases and FAQs.
+"""
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Location, Organization, OrganizationMembership, User
+from apps.common.utils import json_loads
+from apps.knowledge.models import FAQ, KnowledgeBase
+from apps.knowledge.serializers import FAQSerializer
+from apps.knowledge.services import get_knowledge_snapshot
+
+
+class FAQReorderTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="KB Org")
+        self.user = User.objects.create_user(
+            email="kb@test.test", username="kb", password="pw",
+        )
+        OrganizationMembership.objects.create(
+            user=self.user, organization=self.org,
+            role=OrganizationMembership.Role.OWNER,
+        )
+        self.kb = KnowledgeBase.objects.create(organization=self.org)
+        self.faqs = [
+            FAQ.objects.create(knowledge_base=self.kb, question=f"Q{i}", answer="A", order=i)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reorder_in_one_update(self):
+        other_kb = KnowledgeBase.objects.create(organization=Organization.objects.create(name="Other"))
+        foreign = FAQ.objects.create(knowledge_base=other_kb, question="Q", answer="A", order=7)
+        items = [{"id": str(faq.id), "order": 10 - i} for i, faq in enumerate(self.faqs)]
+        items.append({"id": str(foreign.id), "order": 0})
+        # memberships + FAQs + one UPDATE + their orgs' locations (cache invalidation)
+        with self.assertNumQueries(4):
+            response = self.client.post("/api/knowledge/faqs/reorder/", {"items": items}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [faq.order for faq in FAQ.objects.filter(knowledge_base=self.kb).order_by("question")],
+            [10, 9, 8],
+        )
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.order, 7)
+
+    def test_json_columns_decoded_with_fast_loader(self):
+        hours = {"monday": {"open": "09:00", "close": "17:00"}, "note": "caf\u00e9"}
+        KnowledgeBase.objects.filter(pk=self.kb.pk).update(opening_hours=hours, services=["dine-in"])
+        with mock.patch("apps.common.db.json_loads", wraps=json_loads) as loads:
+            kb = KnowledgeBase.objects.get(pk=self.kb.pk)
+        self.assertEqual(kb.opening_hours, hours)
+        self.assertEqual(kb.services, ["dine-in"])
+        self.assertEqual(loads.call_count, 4)
+
+    def test_create_faq_looks_up_knowledge_base_once(self):
+        # KB lookup + memberships + INSERT + snapshot invalidation (locations)
+        with self.assertNumQueries(4) as ctx:
+            response = self.client.post(
+                "/api/knowledge/faqs/",
+                {"knowledge_base": str(self.kb.id), "question": "Q", "answer": "A"},
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("opening_hours", ctx.captured_queries[0]["sql"])
+
+        response = self.client.post(
+            "/api/knowledge/faqs/",
+            {"knowledge_base": "00000000-0000-0000-0000-000000000000", "question": "Q", "answer": "A"},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_streams_ndjson(self):
+        self.faqs[2].is_active = False
+        self.faqs[2].save()
+        response = self.client.get("/api/knowledge/faqs/export/", {"active": "true"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json_loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["question"] for row in rows], ["Q0", "Q1"])
+        self.assertEqual(rows[0], {
+            "id": str(self.faqs[0].id), "knowledge_base": str(self.kb.id),
+            "question": "Q0", "answer": "A", "order": 0, "is_active": True,
+        })
+
+    def test_detail_actions_load_only_knowledge_base_ids(self):
+        faq = self.faqs[0]
+        with self.assertNumQueries(2) as ctx:  # memberships + FAQ
+            response = self.client.get(f"/api/knowledge/faqs/{faq.id}/")
+        self.assertEqual(response.data["organization"], str(self.org.id))
+        self.assertNotIn("business_description", ctx.captured_queries[-1]["sql"])
+
+        response = self.client.patch(f"/api/knowledge/faqs/{faq.id}/", {"answer": "B"})
+        self.assertEqual(response.status_code, 200)
+        faq.refresh_from_db()
+        self.assertEqual((faq.question, faq.answer), ("Q0", "B"))
+
+    def test_reorder_rejects_malformed_items(self):
+        response = self.client.post(
+            "/api/knowledge/faqs/reorder/", {"items": [{"id": str(self.faqs[0].id)}]}, format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_list_without_organization_join(self):
+        self.client.get("/api/knowledge/faqs/")
+        with self.assertNumQueries(2) as ctx:  # count + page; org ids cached
+            response = self.client.get("/api/knowledge/faqs/")
+        self.assertEqual(response.status_code, 200)
+        row = response.data["results"][0]
+        self.assertEqual(row["organization"], str(self.org.id))
+        self.assertIsNone(row["location"])
+        page_sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn('"organizations"."name"', page_sql)
+        self.assertNotIn("opening_hours", page_sql)
+        self.assertNotIn('JOIN "knowledge_bases"', page_sql)
+        self.assertEqual(row["answer"], "A")
+
+    def test_list_serializer_matches_per_faq_output(self):
+        faqs = FAQ.objects.all()
+        self.assertEqual(
+            FAQSerializer(faqs, many=True).data,
+            [FAQSerializer(faq).data for faq in faqs],
+        )
+
+    def test_faq_copies_follow_knowledge_base(self):
+        faq = self.faqs[0]
+        self.assertEqual((faq.organization_id, faq.location_id), (self.org.id, None))
+        location = Location.objects.create(organization=self.org, name="Harbour")
+        self.kb.location = location
+        self.kb.save()
+        self.assertEqual(FAQ.objects.filter(location=location).count(), 3)
+
+        org_kb = KnowledgeBase.objects.create(organization=self.org)
+        response = self.client.patch(f"/api/knowledge/faqs/{faq.id}/", {"knowledge_base": str(org_kb.id)})
+        self.assertEqual(response.status_code, 200)
+        faq.refresh_from_db()
+        self.assertEqual((faq.knowledge_base_id, faq.location_id), (org_kb.id, None))
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_org_ids_cache_dropped_with_membership(self):
+        self.assertEqual(len(self.client.get("/api/knowledge/bases/").data["results"]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrganizationMembership.objects.filter(user=self.user).get().delete()
+        self.assertEqual(len(self.client.get("/api/knowledge/bases/").data["results"]), 0)
+        response = self.client.post(
+            "/api/knowledge/faqs/", {"knowledge_base": str(self.kb.id), "question": "Q", "answer": "A"},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_faqs_without_copies_still_listed(self):
+        # Inserted by a pod from before the organization/location copies
+        FAQ.objects.filter(pk=self.faqs[0].pk).update(organization=None)
+        response = self.client.get("/api/knowledge/faqs/", {"organization": str(self.org.id)})
+        self.assertEqual(response.data["count"], 3)
+        response = self.client.get("/api/knowledge/faqs/export/")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 3)
+        outsider = User.objects.create_user(email="out@test.test", username="out", password="pw")
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get("/api/knowledge/faqs/").data["count"], 0)
+
+    def test_base_list_without_organization_join(self):
+        location = Location.objects.create(organization=self.org, name="Downtown")
+        KnowledgeBase.objects.create(organization=self.org, location=location)
+        response = self.client.get("/api/knowledge/bases/", {"location": str(location.id)})
+        [row] = response.data["results"]
+        self.assertEqual(row["location_name"], "Downtown")
+        self.assertEqual(row["organization"], self.org.id)
+
+    def test_for_organization_includes_faqs(self):
+        self.faqs[1].is_active = False
+        self.faqs[1].save()
+        KnowledgeBase.objects.create(
+            organization=self.org, location=Location.objects.create(organization=self.org, name="Uptown"),
+        )
+        with self.assertNumQueries(3):  # memberships + KBs + all their FAQs
+            response = self.client.get(
+                "/api/knowledge/bases/for_organization/",
+                {"organization": str(self.org.id), "include": "faqs"},
+            )
+        faqs = {row["id"]: row["faqs"] for row in response.json()}
+        self.assertEqual([faq["question"] for faq in faqs[str(self.kb.id)]], ["Q0", "Q2"])
+        self.assertEqual(faqs[str(self.kb.id)][0]["organization"], str(self.org.id))
+        [plain, _] = self.client.get(
+            "/api/knowledge/bases/for_organization/", {"organization": str(self.org.id)},
+        ).json()
+        self.assertNotIn("faqs", plain)
+        # Same shape as the serializer-backed detail endpoint
+        detail = self.client.get(f"/api/knowledge/bases/{plain['id']}/").json()
+        self.assertEqual(plain, detail)
+        faq = faqs[str(self.kb.id)][0]
+        self.assertEqual(faq, self.client.get(f"/api/knowledge/faqs/{faq['id']}/").json())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class KnowledgeSnapshotTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Snapshot Org")
+        self.location = Location.objects.create(organization=self.org, name="Harbour")
+        self.kb = KnowledgeBase.objects.create(organization=self.org, business_description="Org level")
+        self.location_kb = KnowledgeBase.objects.create(
+            organization=self.org, location=self.location, business_description="Harbour branch",
+        )
+        FAQ.objects.create(knowledge_base=self.kb, question="Open?", answer="Yes", order=1)
+
+    def test_snapshot_cached_until_knowledge_changes(self):
+        snapshot = get_knowledge_snapshot(self.org.id, self.location.id)
+        self.assertEqual(snapshot["location_kb"]["business_description"], "Harbour branch")
+        self.assertEqual(snapshot["org_kb"]["business_description"], "Org level")
+        self.assertEqual(snapshot["faqs"], [("Open?", "Yes")])
+        with self.assertNumQueries(0):
+            get_knowledge_snapshot(self.org.id, self.location.id)
+
+        # An org-level FAQ shows up in the location's snapshot too
+        FAQ.objects.create(knowledge_base=self.kb, question="Parking?", answer="No", order=0)
+        self.assertEqual(
+            get_knowledge_snapshot(self.org.id, self.location.id)["faqs"],
+            [("Parking?", "No"), ("Open?", "Yes")],
+        )
+        self.kb.business_description = "Updated"
+        self.kb.save()
+        self.assertEqual(get_knowledge_snapshot(self.org.id)["org_kb"]["business_description"], "Updated")
+        self.assertIsNone(get_knowledge_snapshot(self.org.id)["location_kb"])
+
+    def test_snapshot_includes_faqs_without_copies(self):
+        other = Location.objects.create(organization=self.org, name="Hillside")
+        other_kb = KnowledgeBase.objects.create(organization=self.org, location=other)
+        FAQ.objects.create(knowledge_base=self.location_kb, question="Harbour parking?", answer="Pier")
+        FAQ.objects.create(knowledge_base=other_kb, question="Hillside parking?", answer="Street")
+        # Inserted by pods from before the organization/location copies
+        FAQ.objects.update(organization=None, location=None)
+        faqs = get_knowledge_snapshot(self.org.id, self.location.id)["faqs"]
+        self.assertEqual(sorted(question for question, _ in faqs), ["Harbour parking?", "Open?"])
@@ -1,6 +1,9 @@
 """
 Knowledge base views.
 """
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -12,22 +15,34 @@ from .serializers import (
     FAQSerializer,
     FAQCreateSerializer,
 )
-from apps.accounts.models import OrganizationMembership, Organization
+from .services import invalidate_knowledge_cache
+from apps.common.mixins import UserOrgIdsMixin
+from apps.common.utils import json_dumps
 
 
-class KnowledgeBaseViewSet(viewsets.ModelViewSet):
+class KnowledgeBaseViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing knowledge bases.
     """
     permission_classes = [permissions.IsAuthenticated]
+    # Every KB column is shown (the dashboard edits the first listed KB in
+    # place); of the location row only its name
+    list_only_fields = (
+        'id', 'organization', 'location', 'location__name',
+        'business_description', 'opening_hours', 'contact_info',
+        'services', 'additional_info', 'policies',
+        'created_at', 'updated_at',
+    )
+    # KnowledgeBaseSerializer's fields, as values() for for_organization
+    values_fields = (
+        'id', 'organization', 'location',
+        'business_description', 'opening_hours', 'contact_info',
+        'services', 'additional_info', 'policies',
+        'created_at', 'updated_at',
+    )
 
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
-
-        queryset = KnowledgeBase.objects.filter(organization_id__in=org_ids)
+        queryset = KnowledgeBase.objects.filter(organization_id__in=self._user_org_ids())
 
         # Filter by organization
         org_id = self.request.query_params.get('organization')
@@ -39,7 +54,11 @@ class KnowledgeBaseViewSet(viewsets.ModelViewSet):
         if location_id:
             queryset = queryset.filter(location_id=location_id)
 
-        return queryset.select_related('organization', 'location')
+        # The serializer reads organization as its id; no need to join it
+        queryset = queryset.select_related('location')
+        if self.action in ['list', 'for_organization']:
+            queryset = queryset.only(*self.list_only_fields)
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -49,10 +68,7 @@ class KnowledgeBaseViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         org_id = self.request.data.get('organization')
         # Verify membership
-        if not OrganizationMembership.objects.filter(
-            user=self.request.user,
-            organization_id=org_id
-        ).exists():
+        if str(org_id) not in {str(user_org_id) for user_org_id in self._user_org_ids()}:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('You do not have access to this organization.')
 
@@ -65,28 +81,48 @@ class KnowledgeBaseViewSet(viewsets.ModelViewSet):
         if not org_id:
             return Response({'error': 'Organization ID required.'}, status=400)
 
-        kbs = self.get_queryset().filter(organization_id=org_id)
-        return Response(KnowledgeBaseSerializer(kbs, many=True).data)
-
-
-class FAQViewSet(viewsets.ModelViewSet):
+        # Plain values() rows in the serializers' shape; this is read far
+        # more often than written, so skip ModelSerializer per object
+        kbs = list(self.get_queryset().filter(organization_id=org_id).values(
+            *self.values_fields, location_name=F('location__name')
+        ))
+        if request.query_params.get('include') == 'faqs':
+            # All KBs' active FAQs in one extra query
+            faqs_by_kb = {kb['id']: [] for kb in kbs}
+            for faq in FAQ.objects.active().filter(knowledge_base__in=faqs_by_kb).values(
+                *FAQViewSet.values_fields
+            ):
+                faqs_by_kb[faq['knowledge_base']].append(faq)
+            for kb in kbs:
+                kb['faqs'] = faqs_by_kb[kb['id']]
+        return Response(kbs)
+
+
+class FAQViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing FAQs.
     """
     permission_classes = [permissions.IsAuthenticated]
+    # FAQSerializer's fields, as values() for for_organization?include=faqs
+    values_fields = (
+        'id', 'knowledge_base', 'organization', 'location',
+        'question', 'answer', 'order', 'is_active',
+        'created_at', 'updated_at',
+    )
+    export_fields = ('id', 'knowledge_base', 'question', 'answer', 'order', 'is_active')
+    REORDER_BATCH_SIZE = 500
+    # Saving an FAQ re-copies its knowledge base's organization/location;
+    # of the joined knowledge base only those two FK ids, not its JSON/text
+    # columns
+    write_only_fields = values_fields + ('knowledge_base__organization', 'knowledge_base__location')
 
     def get_queryset(self):
-        user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
-
-        queryset = FAQ.objects.filter(knowledge_base__organization_id__in=org_ids)
+        queryset = FAQ.objects.for_organizations(self._user_org_ids())
 
         # Filter by organization
         org_id = self.request.query_params.get('organization')
         if org_id:
-            queryset = queryset.filter(knowledge_base__organization_id=org_id)
+            queryset = queryset.for_organizations([org_id])
 
         # Filter by knowledge_base
         kb_id = self.request.query_params.get('knowledge_base')
@@ -96,9 +132,14 @@ class FAQViewSet(viewsets.ModelViewSet):
         # Filter by active status
         active = self.request.query_params.get('active')
         if active is not None:
-            queryset = queryset.filter(is_active=active.lower() == 'true')
+            if active.lower() == 'true':
+                queryset = queryset.active()
+            else:
+                queryset = queryset.filter(is_active=False)
 
-        return queryset.select_related('knowledge_base', 'knowledge_base__organization')
+        if self.action in ['update', 'partial_update']:
+            return queryset.select_related('knowledge_base').only(*self.write_only_fields)
+        return queryset.only(*self.values_fields)
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -106,28 +147,66 @@ class FAQViewSet(viewsets.ModelViewSet):
         return FAQSerializer
 
     def perform_create(self, serializer):
-        kb_id = self.request.data.get('knowledge_base')
-        try:
-            kb = KnowledgeBase.objects.get(pk=kb_id)
-        except KnowledgeBase.DoesNotExist:
-            from rest_framework.exceptions import NotFound
-            raise NotFound('Knowledge base not found.')
-            
-        if not OrganizationMembership.objects.filter(
-            user=self.request.user,
-            organization_id=kb.organization_id
-        ).exists():
+        # Already looked up (or rejected as unknown) by serializer validation
+        kb = serializer.validated_data['knowledge_base']
+        if kb.organization_id not in self._user_org_ids():
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied('You do not have access to this organization.')
 
         serializer.save()
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        NDJSON export of the filtered FAQs (same filters as list), one JSON
+        object per line. Streamed in chunks, so memory stays flat however
+        many FAQs the organization has.
+        """
+        rows = self.get_queryset().values_list(*self.export_fields).iterator(chunk_size=2000)
+
+        def lines():
+            for faq_id, kb_id, question, answer, order, is_active in rows:
+                yield json_dumps({
+                    'id': str(faq_id),
+                    'knowledge_base': str(kb_id),
+                    'question': question,
+                    'answer': answer,
+                    'order': order,
+                    'is_active': is_active,
+                }) + b'\n'
+
+        resp = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+        ts = timezone.now().strftime('%Y%m%d-%H%M%S')
+        resp['Content-Disposition'] = f'attachment; filename="faqs-{ts}.ndjson"'
+        return resp
+
     @action(detail=False, methods=['post'])
     def reorder(self, request):
         """Reorder FAQs."""
         items = request.data.get('items', [])  # [{"id": "uuid", "order": 0}, ...]
-
-        for item in items:
-            FAQ.objects.filter(pk=item['id']).update(order=item['order'])
+        try:
+            orders = {str(item['id']): int(item['order']) for item in items}
+        except (KeyError, TypeError, ValueError):
+            return Response(
+                {'error': 'items must be a list of {"id", "order"} objects.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if orders:
+            # Limited to FAQs in the user's organizations; bulk_update writes
+            # each batch of REORDER_BATCH_SIZE in one CASE UPDATE
+            faqs = list(FAQ.objects.for_organizations(self._user_org_ids()).filter(
+                pk__in=orders
+            ).only('id', 'organization', 'knowledge_base'))
+            for faq in faqs:
+                faq.order = orders[str(faq.pk)]
+            FAQ.objects.bulk_update(faqs, ['order'], batch_size=self.REORDER_BATCH_SIZE)
+            # bulk_update skips the FAQ post_save receiver
+            org_ids = {faq.organization_id for faq in faqs if faq.organization_id}
+            uncopied = [faq.knowledge_base_id for faq in faqs if not faq.organization_id]
+            if uncopied:
+                org_ids.update(KnowledgeBase.objects.filter(pk__in=uncopied).values_list('organization_id', flat=True))
+            for org_id in org_ids:
+                invalidate_knowledge_cache(org_id)
 
         return Response({'status': 'FAQs reordered.'})
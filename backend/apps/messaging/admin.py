@@ -2,6 +2,7 @@
 Admin configuration for messaging app.
 """
 from django.contrib import admin
+from django.db.models.functions import Substr
 from .models import Conversation, Message, WidgetSession
 
 
@@ -11,7 +12,14 @@ class ConversationAdmin(admin.ModelAdmin):
     list_filter = ['channel', 'state', 'organization', 'is_locked']
     search_fields = ['customer_name', 'customer_email', 'customer_phone']
     readonly_fields = ['created_at', 'updated_at', 'last_message_at']
-    raw_id_fields = ['organization', 'location', 'assigned_to', 'locked_by']
+    autocomplete_fields = ['organization', 'location', 'assigned_to', 'locked_by']
+
+    def get_queryset(self, request):
+        # Every FK the list or the change form's widgets display (a
+        # location's label includes its organization's name)
+        return super().get_queryset(request).select_related(
+            'organization', 'location__organization', 'assigned_to', 'locked_by'
+        )
 
 
 @admin.register(Message)
@@ -20,10 +28,24 @@ class MessageAdmin(admin.ModelAdmin):
     list_filter = ['sender', 'is_read']
     search_fields = ['content']
     readonly_fields = ['created_at']
-    raw_id_fields = ['conversation', 'sent_by']
+    autocomplete_fields = ['conversation', 'sent_by']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).select_related('conversation', 'sent_by')
+        match = request.resolver_match
+        if match and match.url_name.endswith('_changelist'):
+            # The list shows 50 characters; fetch 51 (to know whether to add
+            # '...') instead of each message's full content
+            queryset = queryset.annotate(
+                _content_preview=Substr('content', 1, 51)
+            ).defer('content')
+        return queryset
 
     def content_preview(self, obj):
-        return obj.content[:50] + '...' if len(obj.content) > 50 else obj.content
+        content = getattr(obj, '_content_preview', None)
+        if content is None:
+            content = obj.content
+        return content[:50] + '...' if len(content) > 50 else content
     content_preview.short_description = 'Content'
 
 
@@ -33,4 +55,11 @@ class WidgetSessionAdmin(admin.ModelAdmin):
     list_filter = ['organization']
     search_fields = ['visitor_id', 'ip_address']
     readonly_fields = ['session_token', 'created_at', 'last_activity_at']
-    raw_id_fields = ['organization', 'conversation', 'location']
+    autocomplete_fields = ['organization', 'conversation', 'location']
+
+    def get_queryset(self, request):
+        # __str__ shows the organization's name; the change form's widgets
+        # show the conversation and location (and its organization)
+        return super().get_queryset(request).select_related(
+            'organization', 'conversation', 'location__organization'
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0003_add_language_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["organization", "channel", "customer_phone"],
+                name="conversatio_organiz_ded0d3_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                condition=models.Q(
+                    (
+                        "state__in",
+                        ["new", "ai_handling", "awaiting_user", "human_handoff"],
+                    )
+                ),
+                fields=["organization", "customer_phone"],
+                name="conv_open_idx",
+            ),
+        ),
+    ]
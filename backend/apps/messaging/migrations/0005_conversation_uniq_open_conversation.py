@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:01
+
+from django.db import migrations, models
+from django.db.models import F
+
+OPEN_STATES = ["new", "ai_handling", "awaiting_user", "human_handoff"]
+
+
+def archive_duplicate_open_conversations(apps, schema_editor):
+    """
+    Keep only the most recent open WhatsApp conversation per customer phone;
+    older duplicates left behind by racing webhooks are archived so the
+    constraint below can be created.
+    """
+    Conversation = apps.get_model("messaging", "Conversation")
+    seen = set()
+    duplicates = []
+    open_conversations = (
+        Conversation.objects.filter(channel="whatsapp", state__in=OPEN_STATES)
+        .exclude(customer_phone="")
+        .order_by(
+            "organization_id",
+            "customer_phone",
+            F("last_message_at").desc(nulls_last=True),
+            "-created_at",
+        )
+        .values_list("id", "organization_id", "customer_phone")
+    )
+    for pk, org_id, phone in open_conversations.iterator():
+        if (org_id, phone) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add((org_id, phone))
+    if duplicates:
+        Conversation.objects.filter(id__in=duplicates).update(state="archived")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0004_conversation_phone_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            archive_duplicate_open_conversations, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="conversation",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("channel", "whatsapp"),
+                    (
+                        "state__in",
+                        ["new", "ai_handling", "awaiting_user", "human_handoff"],
+                    ),
+                    models.Q(("customer_phone", ""), _negated=True),
+                ),
+                fields=("organization", "channel", "customer_phone"),
+                name="uniq_open_conversation",
+            ),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:05
+
+import logging
+
+from django.db import migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# Admin (and inbox) search fields that get a pg_trgm GIN index. Django
+# compiles icontains on PostgreSQL to UPPER(col::text) LIKE UPPER('%q%'),
+# which only an index on that same expression can serve
+TRIGRAM_INDEXES = [
+    ("msg_content_up_trgm", "messages", "content"),
+    ("conv_cust_name_up_trgm", "conversations", "customer_name"),
+    ("conv_cust_email_up_trgm", "conversations", "customer_email"),
+    ("conv_cust_phone_up_trgm", "conversations", "customer_phone"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    PostgreSQL only (SQLite has no GIN/pg_trgm). Skipped with a warning if
+    the database role may not create the pg_trgm extension; admin search
+    then keeps working, just unindexed.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic():
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception:
+        logger.warning("pg_trgm unavailable; skipping admin search trigram indexes")
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0005_conversation_uniq_open_conversation"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0006_admin_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="conversation",
+            name="conversatio_organiz_0461ff_idx",
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["organization", "-last_message_at"], name="conv_org_lastmsg_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["organization", "state", "-last_message_at"],
+                name="conv_org_state_lastmsg_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                condition=models.Q(("assigned_to__isnull", False)),
+                fields=["organization", "assigned_to"],
+                name="conv_org_assigned_partial",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "sender", "is_read"], name="msg_unread_idx"
+            ),
+        ),
+    ]
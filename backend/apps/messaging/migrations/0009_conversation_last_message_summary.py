@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:52
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+
+def backfill_last_message(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    Message = apps.get_model("messaging", "Message")
+    latest = Message.objects.filter(
+        conversation_id=models.OuterRef("pk")
+    ).order_by("-created_at")[:1]
+    Conversation.objects.filter(pk__in=Message.objects.values("conversation_id")).update(
+        last_message_content=models.Subquery(
+            latest.annotate(preview=Substr("content", 1, 100)).values("preview")
+        ),
+        last_message_sender=models.Subquery(latest.values("sender")),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0007_inbox_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message_content",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="conversation",
+            name="last_message_sender",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:10
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_count(apps, schema_editor):
+    Conversation = apps.get_model("messaging", "Conversation")
+    Message = apps.get_model("messaging", "Message")
+    unread = (
+        Message.objects.filter(conversation_id=models.OuterRef("pk"), sender="customer", is_read=False)
+        .order_by()
+        .values("conversation_id")
+        .annotate(total=models.Count("pk"))
+        .values("total")
+    )
+    Conversation.objects.filter(
+        pk__in=Message.objects.filter(sender="customer", is_read=False).values("conversation_id")
+    ).update(unread_customer_count=Coalesce(models.Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0009_conversation_last_message_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="unread_customer_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_count, migrations.RunPython.noop),
+    ]
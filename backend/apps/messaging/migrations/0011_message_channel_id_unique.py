@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:35
+
+from django.db import migrations, models
+
+
+def clear_duplicate_channel_ids(apps, schema_editor):
+    """
+    Redelivered webhooks could store a message twice; keep the external ID on
+    the first copy only so the unique constraint can be added. No rows are
+    deleted.
+    """
+    Message = apps.get_model("messaging", "Message")
+    duplicated = (
+        Message.objects.filter(channel_message_id__gt="")
+        .values("channel_message_id")
+        .annotate(copies=models.Count("pk"))
+        .filter(copies__gt=1)
+        .values_list("channel_message_id", flat=True)
+    )
+    for channel_message_id in duplicated:
+        copies = Message.objects.filter(channel_message_id=channel_message_id).order_by("created_at", "pk")
+        first = copies.values_list("pk", flat=True)[0]
+        copies.exclude(pk=first).update(channel_message_id="")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0010_conversation_unread_customer_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                condition=models.Q(("channel_conversation_id__gt", "")),
+                fields=["organization", "channel", "channel_conversation_id"],
+                name="conv_org_channel_extid_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="conversation",
+            name="conversatio_channel_2a6efb_idx",
+        ),
+        migrations.RunPython(clear_duplicate_channel_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="message",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("channel_message_id__gt", "")),
+                fields=("channel_message_id",),
+                name="msg_channel_msgid_uniq",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="message",
+            name="messages_channel_9cfdfd_idx",
+        ),
+    ]
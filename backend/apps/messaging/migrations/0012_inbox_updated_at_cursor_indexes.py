@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("messaging", "0011_message_channel_id_unique"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["organization", "-updated_at", "-id"],
+                name="conv_org_updated_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["organization", "state", "-updated_at", "-id"],
+                name="conv_org_state_updated_idx",
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="conversation",
+            name="conv_org_lastmsg_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="conversation",
+            name="conv_org_state_lastmsg_idx",
+        ),
+    ]
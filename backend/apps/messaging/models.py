@@ -8,6 +8,9 @@ from django.db import models
 from django.conf import settings
 from apps.accounts.models import Organization, Location
 
+# Characters of the latest message kept on its conversation for the inbox
+LAST_MESSAGE_PREVIEW_LENGTH = 100
+
 
 class LanguageChoice(models.TextChoices):
     """Supported languages for conversations."""
@@ -43,6 +46,17 @@ class ConversationState(models.TextChoices):
     ARCHIVED = 'archived', 'Archived'
 
 
+# Allowed ConversationState moves, built once rather than per transition
+_VALID_TRANSITIONS = {
+    ConversationState.NEW: frozenset({ConversationState.AI_HANDLING, ConversationState.HUMAN_HANDOFF}),
+    ConversationState.AI_HANDLING: frozenset({ConversationState.AWAITING_USER, ConversationState.HUMAN_HANDOFF, ConversationState.RESOLVED}),
+    ConversationState.AWAITING_USER: frozenset({ConversationState.AI_HANDLING, ConversationState.HUMAN_HANDOFF, ConversationState.ARCHIVED}),
+    ConversationState.HUMAN_HANDOFF: frozenset({ConversationState.AI_HANDLING, ConversationState.RESOLVED}),
+    ConversationState.RESOLVED: frozenset({ConversationState.ARCHIVED, ConversationState.AI_HANDLING}),
+    ConversationState.ARCHIVED: frozenset({ConversationState.AI_HANDLING}),
+}
+
+
 class Conversation(models.Model):
     """
     Unified conversation model across all channels.
@@ -113,6 +127,13 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     last_message_at = models.DateTimeField(null=True, blank=True)
+    # The latest message's preview and sender, kept with last_message_at
+    # (see Message.last_message_fields) so the inbox reads them directly
+    last_message_content = models.CharField(max_length=LAST_MESSAGE_PREVIEW_LENGTH, blank=True)
+    last_message_sender = models.CharField(max_length=20, blank=True)
+    # Unread customer messages: counted up as they arrive, zeroed by the
+    # inbox's mark_read
+    unread_customer_count = models.PositiveIntegerField(default=0)
     resolved_at = models.DateTimeField(null=True, blank=True)
     
     # Locking (for human handoff)
@@ -130,46 +151,105 @@ class Conversation(models.Model):
         db_table = 'conversations'
         ordering = ['-last_message_at', '-created_at']
         indexes = [
-            models.Index(fields=['organization', 'state']),
-            models.Index(fields=['channel', 'channel_conversation_id']),
             models.Index(fields=['-last_message_at']),
+            # Instagram's open-thread lookup by the customer's ID. Not unique:
+            # a resolved thread is followed by a new one for the same customer
+            models.Index(
+                fields=['organization', 'channel', 'channel_conversation_id'],
+                condition=models.Q(channel_conversation_id__gt=''),
+                name='conv_org_channel_extid_idx',
+            ),
+            # The inbox: an organization's conversations, most recently updated
+            # first (ConversationPagination's cursor), optionally narrowed to
+            # one state or to assigned ones
+            models.Index(fields=['organization', '-updated_at', '-id'], name='conv_org_updated_idx'),
+            models.Index(fields=['organization', 'state', '-updated_at', '-id'], name='conv_org_state_updated_idx'),
+            models.Index(
+                fields=['organization', 'assigned_to'],
+                condition=models.Q(assigned_to__isnull=False),
+                name='conv_org_assigned_partial',
+            ),
+            # Inbound webhook lookup of a customer's conversation by phone
+            models.Index(fields=['organization', 'channel', 'customer_phone']),
+            models.Index(
+                fields=['organization', 'customer_phone'],
+                condition=models.Q(state__in=[
+                    ConversationState.NEW,
+                    ConversationState.AI_HANDLING,
+                    ConversationState.AWAITING_USER,
+                    ConversationState.HUMAN_HANDOFF,
+                ]),
+                name='conv_open_idx',
+            ),
+        ]
+        constraints = [
+            # At most one open WhatsApp conversation per customer phone, so
+            # concurrent webhooks can't both create one
+            models.UniqueConstraint(
+                fields=['organization', 'channel', 'customer_phone'],
+                condition=models.Q(
+                    channel=Channel.WHATSAPP,
+                    state__in=[
+                        ConversationState.NEW,
+                        ConversationState.AI_HANDLING,
+                        ConversationState.AWAITING_USER,
+                        ConversationState.HUMAN_HANDOFF,
+                    ],
+                ) & ~models.Q(customer_phone=''),
+                name='uniq_open_conversation',
+            ),
         ]
     
     def __str__(self):
         return f"{self.channel} - {self.customer_name or 'Anonymous'} ({self.state})"
     
-    def transition_state(self, new_state: ConversationState):
+    def transition_state(self, new_state: ConversationState, save: bool = True):
         """
         Transition conversation to a new state.
-        Implements basic FSM validation.
+        Implements basic FSM validation. With save=False the caller saves
+        (state and resolved_at) along with its own changes.
         """
-        valid_transitions = {
-            ConversationState.NEW: [ConversationState.AI_HANDLING, ConversationState.HUMAN_HANDOFF],
-            ConversationState.AI_HANDLING: [ConversationState.AWAITING_USER, ConversationState.HUMAN_HANDOFF, ConversationState.RESOLVED],
-            ConversationState.AWAITING_USER: [ConversationState.AI_HANDLING, ConversationState.HUMAN_HANDOFF, ConversationState.ARCHIVED],
-            ConversationState.HUMAN_HANDOFF: [ConversationState.AI_HANDLING, ConversationState.RESOLVED],
-            ConversationState.RESOLVED: [ConversationState.ARCHIVED, ConversationState.AI_HANDLING],
-            ConversationState.ARCHIVED: [ConversationState.AI_HANDLING],
-        }
-        
-        if new_state in valid_transitions.get(self.state, []):
+        if new_state in _VALID_TRANSITIONS.get(self.state, ()):
             self.state = new_state
             if new_state == ConversationState.RESOLVED:
                 from django.utils import timezone
                 self.resolved_at = timezone.now()
-            self.save(update_fields=['state', 'resolved_at', 'updated_at'])
+            if save:
+                self.save(update_fields=['state', 'resolved_at', 'updated_at'])
             return True
         return False
     
-    def lock(self, user):
-        """Lock conversation for human handling."""
+    def _apply_lock(self, user) -> list:
+        """Set the lock (and the handoff state, if allowed); return the changed fields."""
         from django.utils import timezone
         self.is_locked = True
         self.locked_by = user
         self.locked_at = timezone.now()
         self.assigned_to = user
-        self.transition_state(ConversationState.HUMAN_HANDOFF)
-        self.save()
+        self.updated_at = self.locked_at
+        update_fields = ['is_locked', 'locked_by', 'locked_at', 'assigned_to', 'updated_at']
+        if self.transition_state(ConversationState.HUMAN_HANDOFF, save=False):
+            update_fields += ['state', 'resolved_at']
+        return update_fields
+
+    def lock(self, user):
+        """Lock conversation for human handling."""
+        # One UPDATE of the changed columns
+        self.save(update_fields=self._apply_lock(user))
+
+    def try_lock(self, user) -> bool:
+        """
+        Lock for `user` unless another agent holds the lock. The check and the
+        write are one conditional UPDATE, so of two agents taking over at
+        once exactly one wins; the loser's instance is reloaded.
+        """
+        update_fields = self._apply_lock(user)
+        claimed = Conversation.objects.filter(
+            models.Q(is_locked=False) | models.Q(locked_by=user), pk=self.pk
+        ).update(**{field: getattr(self, field) for field in update_fields})
+        if not claimed:
+            self.refresh_from_db(fields=update_fields)
+        return bool(claimed)
     
     def unlock(self):
         """Unlock conversation, return to AI handling."""
@@ -178,6 +258,30 @@ class Conversation(models.Model):
         self.locked_at = None
         self.save(update_fields=['is_locked', 'locked_by', 'locked_at', 'updated_at'])
 
+    def unlock_and_resume(self) -> bool:
+        """
+        Unlock and hand back to the AI (if the state allows) in one UPDATE.
+        The UPDATE only applies while the lock holder is still the one this
+        instance saw (and the caller checked), so a takeover in between is
+        not undone; then nothing is written, the instance is reloaded and
+        False returned.
+        """
+        from django.utils import timezone
+        seen_holder = self.locked_by_id
+        self.is_locked = False
+        self.locked_by = None
+        self.locked_at = None
+        self.updated_at = timezone.now()
+        update_fields = ['is_locked', 'locked_by', 'locked_at', 'updated_at']
+        if self.transition_state(ConversationState.AI_HANDLING, save=False):
+            update_fields += ['state', 'resolved_at']
+        unlocked = Conversation.objects.filter(pk=self.pk, locked_by=seen_holder).update(
+            **{field: getattr(self, field) for field in update_fields}
+        )
+        if not unlocked:
+            self.refresh_from_db(fields=update_fields)
+        return bool(unlocked)
+
 
 class MessageSender(models.TextChoices):
     """Who sent the message."""
@@ -240,18 +344,29 @@ class Message(models.Model):
         ordering = ['created_at']
         indexes = [
             models.Index(fields=['conversation', 'created_at']),
-            models.Index(fields=['channel_message_id']),
+            # A conversation's unread customer messages (inbox unread_count)
+            models.Index(fields=['conversation', 'sender', 'is_read'], name='msg_unread_idx'),
+        ]
+        constraints = [
+            # External IDs are unique per message; a redelivered webhook can't
+            # store the same message twice
+            models.UniqueConstraint(
+                fields=['channel_message_id'],
+                condition=models.Q(channel_message_id__gt=''),
+                name='msg_channel_msgid_uniq',
+            ),
         ]
     
     def __str__(self):
         return f"{self.sender}: {self.content[:50]}..."
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update conversation's last_message_at
-        from django.utils import timezone
-        self.conversation.last_message_at = timezone.now()
-        self.conversation.save(update_fields=['last_message_at', 'updated_at'])
+
+    def last_message_fields(self) -> dict:
+        """The Conversation columns that summarize this message as its latest."""
+        return {
+            'last_message_at': self.created_at,
+            'last_message_content': self.content[:LAST_MESSAGE_PREVIEW_LENGTH],
+            'last_message_sender': self.sender,
+        }
 
 
 class WidgetSession(models.Model):
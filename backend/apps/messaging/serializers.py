@@ -2,7 +2,7 @@
 Messaging serializers for API.
 """
 from rest_framework import serializers
-from .models import Conversation, Message, WidgetSession, ConversationState, MessageSender
+from .models import Conversation, Message, WidgetSession, ConversationState
 
 
 class MessageSerializer(serializers.ModelSerializer):
@@ -19,6 +19,9 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'sent_by', 'sent_by_name', 'confidence_score', 'intent', 'ai_metadata', 'created_at']
     
     def get_sent_by_name(self, obj):
+        # Annotated by the messaging views; other callers load the user
+        if hasattr(obj, '_sent_by_name'):
+            return obj._sent_by_name
         if obj.sent_by:
             return f"{obj.sent_by.first_name} {obj.sent_by.last_name}".strip() or obj.sent_by.email
         return None
@@ -56,19 +59,24 @@ class ConversationSerializer(serializers.ModelSerializer):
             'is_locked', 'locked_by', 'locked_at'
         ]
     
+    # The _messages_count annotation is set by ConversationViewSet; other
+    # callers fall back to a query
     def get_messages_count(self, obj):
+        if hasattr(obj, '_messages_count'):
+            return obj._messages_count
         return obj.messages.count()
     
     def get_unread_count(self, obj):
-        return obj.messages.filter(is_read=False, sender=MessageSender.CUSTOMER).count()
+        # Kept on the conversation as messages arrive and are marked read
+        return obj.unread_customer_count
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.order_by('-created_at').first()
-        if last_msg:
+        # Kept on the conversation as each message is created
+        if obj.last_message_sender:
             return {
-                'content': last_msg.content[:100],
-                'sender': last_msg.sender,
-                'created_at': last_msg.created_at
+                'content': obj.last_message_content,
+                'sender': obj.last_message_sender,
+                'created_at': obj.last_message_at
             }
         return None
     
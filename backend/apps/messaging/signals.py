@@ -0,0 +1,32 @@
+"""
+Messaging signal receivers.
+
+Record a newly created message on its conversation (last_message_at, the
+inbox preview, see Message.last_message_fields, and the unread count).
+bulk_create skips this receiver, so bulk paths update the touched
+conversations themselves (see WhatsAppService._handle_incoming_messages).
+"""
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Conversation, Message, MessageSender
+
+
+@receiver(post_save, sender=Message)
+def touch_conversation(sender, instance, created, **kwargs):
+    if not created:
+        return
+    fields = instance.last_message_fields()
+    fields['updated_at'] = timezone.now()
+    unread = {}
+    if instance.sender == MessageSender.CUSTOMER:
+        unread['unread_customer_count'] = F('unread_customer_count') + 1
+    # One UPDATE; the conversation row is neither loaded nor re-saved whole
+    Conversation.objects.filter(pk=instance.conversation_id).update(**fields, **unread)
+    if Message.conversation.is_cached(instance):
+        for name, value in fields.items():
+            setattr(instance.conversation, name, value)
+        if unread:
+            instance.conversation.unread_customer_count += 1
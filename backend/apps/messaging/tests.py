@@ -0,0 +1,233 @@
+"""
+Tests for the unified inbox.
+"""
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Organization, OrganizationMembership, User
+from apps.messaging.models import Conversation, ConversationState, Message, Channel, MessageSender
+from apps.messaging.views import ConversationPagination
+
+
+class ConversationListTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Inbox Org")
+        self.user = User.objects.create_user(
+            email="inbox@test.test", username="inbox", password="pw",
+            first_name="Ivy", last_name="Inbox",
+        )
+        OrganizationMembership.objects.create(
+            user=self.user, organization=self.org,
+            role=OrganizationMembership.Role.OWNER,
+        )
+        self.conversations = []
+        for i in range(3):
+            conversation = Conversation.objects.create(
+                organization=self.org, channel=Channel.WEBSITE, customer_name=f"Cust {i}",
+            )
+            Message.objects.create(
+                conversation=conversation, sender=MessageSender.CUSTOMER, content="x" * 150,
+            )
+            Message.objects.create(
+                conversation=conversation, sender=MessageSender.HUMAN, sent_by=self.user,
+                content=f"reply {i}",
+            )
+            self.conversations.append(conversation)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_message_summary_without_n_plus_one(self):
+        Conversation.objects.create(organization=self.org, channel=Channel.WEBSITE, customer_name="Empty")
+        with self.assertNumQueries(2) as ctx:  # memberships + page; cursor pagination: no COUNT
+            response = self.client.get("/api/conversations/")
+        self.assertEqual(response.status_code, 200)
+        page_sql = ctx.captured_queries[-1]["sql"]
+        self.assertNotIn('"organizations"', page_sql)
+        self.assertNotIn("password", page_sql)
+        self.assertNotIn("channel_conversation_id", page_sql)
+        rows = {row["customer_name"]: row for row in response.data["results"]}
+        self.assertEqual(rows["Cust 0"]["messages_count"], 2)
+        self.assertEqual(rows["Cust 0"]["unread_count"], 1)
+        self.assertEqual(rows["Cust 0"]["last_message"]["content"], "reply 0")
+        self.assertEqual(rows["Cust 0"]["last_message"]["sender"], MessageSender.HUMAN)
+        self.assertEqual((rows["Empty"]["messages_count"], rows["Empty"]["last_message"]), (0, None))
+
+    def test_list_cursor_paginated_by_recent_activity(self):
+        Message.objects.create(conversation=self.conversations[0], sender=MessageSender.CUSTOMER, content="bump")
+        with mock.patch.object(ConversationPagination, "page_size", 2):
+            response = self.client.get("/api/conversations/")
+            names = [row["customer_name"] for row in response.data["results"]]
+            self.assertNotIn("count", response.data)
+            response = self.client.get(response.data["next"])
+        names += [row["customer_name"] for row in response.data["results"]]
+        self.assertEqual(names, ["Cust 0", "Cust 2", "Cust 1"])
+        self.assertIsNone(response.data["next"])
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_org_ids_cached_across_requests(self):
+        self.client.get("/api/conversations/")
+        with self.assertNumQueries(1):  # page
+            response = self.client.get("/api/conversations/")
+        self.assertEqual(len(response.data["results"]), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            OrganizationMembership.objects.get(user=self.user).delete()
+        self.assertEqual(self.client.get("/api/conversations/").data["results"], [])
+
+    def test_detail_messages_with_senders_prefetched(self):
+        conversation = self.conversations[0]
+        with self.assertNumQueries(3) as ctx:  # memberships + conversation + messages
+            response = self.client.get(f"/api/conversations/{conversation.id}/")
+        self.assertEqual([m["sent_by_name"] for m in response.data["messages"]], [None, "Ivy Inbox"])
+        self.assertNotIn("password", ctx.captured_queries[-1]["sql"])
+        self.assertEqual(response.data["last_message"]["content"], "reply 0")
+        User.objects.filter(pk=self.user.pk).update(first_name="", last_name="")
+        with self.assertNumQueries(1):  # cursor pagination: no COUNT
+            response = self.client.get(f"/api/conversations/{conversation.id}/messages/")
+        self.assertEqual([m["sent_by_name"] for m in response.data["results"]], ["inbox@test.test", None])
+        self.assertIsNone(response.data["next"])
+
+    def test_mark_read_resets_unread_count(self):
+        conversation = self.conversations[0]
+        Message.objects.create(conversation=conversation, sender=MessageSender.CUSTOMER, content="again")
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_customer_count, 2)
+        response = self.client.post(f"/api/conversations/{conversation.id}/messages/mark_read/")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f"/api/conversations/{conversation.id}/")
+        self.assertEqual(response.data["unread_count"], 0)
+
+    def test_mark_read_keeps_messages_counted_meanwhile(self):
+        conversation = self.conversations[0]
+        # One more customer message counted, but committed after mark_read's UPDATE
+        Conversation.objects.filter(pk=conversation.pk).update(unread_customer_count=2)
+        self.client.post(f"/api/conversations/{conversation.id}/messages/mark_read/")
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_customer_count, 1)
+
+
+class MessageTouchesConversationTest(TestCase):
+    def test_created_message_bumps_last_message_at(self):
+        conversation = Conversation.objects.create(
+            organization=Organization.objects.create(name="Touch Org"), channel=Channel.WEBSITE,
+        )
+        fresh = Conversation.objects.get(pk=conversation.pk)
+        with self.assertNumQueries(2):  # INSERT + conversation UPDATE
+            message = Message.objects.create(conversation=fresh, content="hi")
+        conversation.refresh_from_db()
+        self.assertIsNotNone(conversation.last_message_at)
+        self.assertEqual(fresh.last_message_at, conversation.last_message_at)
+
+        message.is_read = True
+        with self.assertNumQueries(1):
+            message.save(update_fields=["is_read"])
+
+    def test_agent_message_locks_conversation_in_one_update(self):
+        user = User.objects.create_user(email="agent@test.test", username="agent", password="pw")
+        conversation = Conversation.objects.create(
+            organization=Organization.objects.create(name="Lock Org"), channel=Channel.WEBSITE,
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        # conversation + INSERT + last_message_at UPDATE + lock UPDATE
+        with self.assertNumQueries(4):
+            response = client.post(f"/api/conversations/{conversation.id}/messages/", {"content": "On it"})
+        self.assertEqual(response.status_code, 201)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.state, ConversationState.HUMAN_HANDOFF)
+        self.assertTrue(conversation.is_locked)
+        self.assertEqual((conversation.locked_by, conversation.assigned_to), (user, user))
+
+
+class ConversationAssignTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Assign Org")
+        self.owner = User.objects.create_user(email="owner@test.test", username="owner", password="pw")
+        self.agent = User.objects.create_user(email="agent@test.test", username="agent", password="pw")
+        for user in (self.owner, self.agent):
+            OrganizationMembership.objects.create(
+                user=user, organization=self.org, role=OrganizationMembership.Role.OWNER,
+            )
+        self.conversation = Conversation.objects.create(organization=self.org, channel=Channel.WEBSITE)
+        self.url = f"/api/conversations/{self.conversation.id}/assign/"
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_assign_member_with_one_lookup(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {"user_id": str(self.agent.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["assigned_to"], self.agent.id)
+        # The agent comes joined to their membership, not from a users query
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "users"' in q["sql"]])
+
+    def test_assign_rejects_non_member_and_unknown_user(self):
+        outsider = User.objects.create_user(email="out@test.test", username="out", password="pw")
+        response = self.client.post(self.url, {"user_id": str(outsider.id)})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {"user_id": "00000000-0000-0000-0000-000000000000"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ConversationLockTest(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Lock Race Org")
+        self.first = User.objects.create_user(email="first@test.test", username="first", password="pw")
+        self.second = User.objects.create_user(email="second@test.test", username="second", password="pw")
+        self.conversation = Conversation.objects.create(organization=org, channel=Channel.WHATSAPP)
+
+    def test_only_one_agent_wins_a_concurrent_takeover(self):
+        # Both agents loaded the conversation while it was still unlocked
+        stale = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertTrue(self.conversation.try_lock(self.first))
+        self.assertFalse(stale.try_lock(self.second))
+        self.assertEqual((stale.locked_by, stale.assigned_to), (self.first, self.first))
+
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.locked_by, self.first)
+        self.assertEqual(self.conversation.state, ConversationState.HUMAN_HANDOFF)
+        self.assertTrue(self.conversation.try_lock(self.first))  # re-locking is allowed
+
+    def test_unlock_does_not_undo_a_takeover(self):
+        self.conversation.lock(self.first)
+        stale = Conversation.objects.get(pk=self.conversation.pk)
+        self.assertTrue(self.conversation.unlock_and_resume())
+        self.assertTrue(self.conversation.try_lock(self.second))
+        # The first agent's unlock was checked against their own lock
+        self.assertFalse(stale.unlock_and_resume())
+        self.assertEqual((stale.is_locked, stale.locked_by), (True, self.second))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.locked_by, self.second)
+
+    def test_unlock_resumes_ai_in_one_update(self):
+        OrganizationMembership.objects.create(
+            user=self.first, organization=self.conversation.organization,
+            role=OrganizationMembership.Role.OWNER,
+        )
+        self.conversation.lock(self.first)
+        client = APIClient()
+        client.force_authenticate(self.first)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(f"/api/conversations/{self.conversation.id}/unlock/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]), 1)
+        self.conversation.refresh_from_db()
+        self.assertFalse(self.conversation.is_locked)
+        self.assertEqual(self.conversation.state, ConversationState.AI_HANDLING)
+
+    def test_only_locker_or_owner_unlocks(self):
+        org = self.conversation.organization
+        OrganizationMembership.objects.create(
+            user=self.second, organization=org, role=OrganizationMembership.Role.MANAGER,
+        )
+        self.conversation.lock(self.first)
+        client = APIClient()
+        client.force_authenticate(self.second)
+        response = client.post(f"/api/conversations/{self.conversation.id}/unlock/")
+        self.assertEqual(response.status_code, 403)
+        OrganizationMembership.objects.filter(user=self.second).update(role=OrganizationMembership.Role.OWNER)
+        response = client.post(f"/api/conversations/{self.conversation.id}/unlock/")
+        self.assertEqual(response.status_code, 200)
@@ -4,9 +4,11 @@ Messaging views for unified inbox.
 import logging
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import CharField, Count, F, Prefetch, Q, Value
+from django.db.models.functions import Coalesce, Concat, Greatest, NullIf, Trim
 
 from .models import Conversation, Message, ConversationState, MessageSender, Channel
 from .serializers import (
@@ -17,24 +19,53 @@ from .serializers import (
     MessageCreateSerializer,
 )
 from apps.accounts.models import OrganizationMembership
+from apps.common.mixins import UserOrgIdsMixin
 
 logger = logging.getLogger(__name__)
 
 
-class ConversationViewSet(viewsets.ModelViewSet):
+def _with_sent_by_name(queryset):
+    """
+    Annotate MessageSerializer's sent_by_name ("First Last", else the email)
+    in SQL, joining the sender instead of loading a user per message.
+    """
+    return queryset.annotate(_sent_by_name=Coalesce(
+        NullIf(Trim(Concat('sent_by__first_name', Value(' '), 'sent_by__last_name')), Value('')),
+        'sent_by__email',
+        output_field=CharField()
+    ))
+
+
+class ConversationPagination(CursorPagination):
+    # Seeks on the (organization, updated_at, id) index however deep the
+    # inbox is scrolled; a new message bumps updated_at
+    ordering = ('-updated_at', '-id')
+    page_size = 20
+
+
+class ConversationViewSet(UserOrgIdsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing conversations (Unified Inbox).
+    The list is cursor-paginated, most recently updated first.
     """
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ConversationPagination
+    # ConversationSerializer's columns; of the joined rows only the location
+    # name and the assignee's name/email, and no organization row at all
+    list_only_fields = (
+        'id', 'organization', 'location', 'location__name', 'channel',
+        'customer_name', 'customer_email', 'customer_phone', 'customer_metadata',
+        'state', 'assigned_to', 'assigned_to__first_name', 'assigned_to__last_name',
+        'assigned_to__email', 'intent', 'sentiment', 'tags',
+        'is_locked', 'locked_by', 'locked_at',
+        'created_at', 'updated_at', 'last_message_at', 'resolved_at',
+        'last_message_content', 'last_message_sender', 'unread_customer_count',
+    )
 
     def get_queryset(self):
         """Return conversations for user's organizations."""
         user = self.request.user
-        org_ids = OrganizationMembership.objects.filter(
-            user=user
-        ).values_list('organization_id', flat=True)
-
-        queryset = Conversation.objects.filter(organization_id__in=org_ids)
+        queryset = Conversation.objects.filter(organization_id__in=self._user_org_ids())
 
         # Filter by organization
         org_id = self.request.query_params.get('organization')
@@ -72,7 +103,25 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 Q(customer_phone__icontains=search)
             )
 
-        return queryset.select_related('organization', 'location', 'assigned_to')
+        if self.action == 'list':
+            queryset = queryset.select_related('location', 'assigned_to').only(*self.list_only_fields)
+        else:
+            queryset = queryset.select_related('organization', 'location', 'assigned_to')
+        if self.action not in ['update', 'partial_update', 'destroy']:
+            queryset = self._with_message_summary(queryset)
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('messages', queryset=_with_sent_by_name(Message.objects.all()))
+            )
+        return queryset
+
+    @staticmethod
+    def _with_message_summary(queryset):
+        """
+        Annotate the message count ConversationSerializer shows, so a page
+        is one query instead of one more per conversation.
+        """
+        return queryset.annotate(_messages_count=Count('messages'))
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -85,12 +134,11 @@ class ConversationViewSet(viewsets.ModelViewSet):
     def lock(self, request, pk=None):
         """Lock conversation for human handling."""
         conversation = self.get_object()
-        if conversation.is_locked and conversation.locked_by != request.user:
+        if not conversation.try_lock(request.user):
             return Response(
                 {'error': 'Conversation is already locked by another agent.'},
                 status=status.HTTP_409_CONFLICT
             )
-        conversation.lock(request.user)
         
         # Create a handoff alert for this conversation
         from apps.handoff.services import create_alert_for_manual_handoff
@@ -102,20 +150,19 @@ class ConversationViewSet(viewsets.ModelViewSet):
     def unlock(self, request, pk=None):
         """Unlock conversation, return to AI handling."""
         conversation = self.get_object()
-        if conversation.locked_by and conversation.locked_by != request.user:
+        if conversation.locked_by_id and conversation.locked_by_id != request.user.pk:
             # Only owner or the locker can unlock
-            membership = OrganizationMembership.objects.filter(
-                user=request.user,
-                organization=conversation.organization,
-                role=OrganizationMembership.Role.OWNER
-            ).exists()
-            if not membership:
+            membership = self._get_membership(conversation.organization_id)
+            if not membership or membership.role != OrganizationMembership.Role.OWNER:
                 return Response(
                     {'error': 'Only the locking agent or an owner can unlock.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
-        conversation.unlock()
-        conversation.transition_state(ConversationState.AI_HANDLING)
+        if not conversation.unlock_and_resume():
+            return Response(
+                {'error': 'Conversation was locked by another agent meanwhile.'},
+                status=status.HTTP_409_CONFLICT
+            )
         return Response(ConversationDetailSerializer(conversation).data)
 
     @action(detail=True, methods=['post'])
@@ -125,18 +172,13 @@ class ConversationViewSet(viewsets.ModelViewSet):
         conversation.transition_state(ConversationState.RESOLVED)
         
         # Auto-resolve all handoff alerts for this conversation
-        from apps.handoff.models import HandoffAlert
-        unresolved_alerts = HandoffAlert.objects.filter(
-            conversation=conversation,
-            is_resolved=False
+        from apps.handoff.services import resolve_conversation_alerts
+        resolve_conversation_alerts(
+            conversation,
+            user=request.user,
+            notes="Auto-resolved when conversation was marked as resolved"
         )
         
-        for alert in unresolved_alerts:
-            alert.resolve(
-                user=request.user,
-                notes="Auto-resolved when conversation was marked as resolved"
-            )
-        
         return Response(ConversationDetailSerializer(conversation).data)
 
     @action(detail=True, methods=['post'])
@@ -146,25 +188,23 @@ class ConversationViewSet(viewsets.ModelViewSet):
         user_id = request.data.get('user_id')
 
         if user_id:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            try:
-                agent = User.objects.get(pk=user_id)
-                # Verify agent is member of the org
-                if not OrganizationMembership.objects.filter(
-                    user=agent,
-                    organization=conversation.organization
-                ).exists():
+            # The agent's membership of the org, with the agent, in one query
+            membership = OrganizationMembership.objects.filter(
+                user_id=user_id,
+                organization_id=conversation.organization_id
+            ).select_related('user').first()
+            if membership is None:
+                from django.contrib.auth import get_user_model
+                if not get_user_model().objects.filter(pk=user_id).exists():
                     return Response(
-                        {'error': 'User is not a member of this organization.'},
-                        status=status.HTTP_400_BAD_REQUEST
+                        {'error': 'User not found.'},
+                        status=status.HTTP_404_NOT_FOUND
                     )
-                conversation.assigned_to = agent
-            except User.DoesNotExist:
                 return Response(
-                    {'error': 'User not found.'},
-                    status=status.HTTP_404_NOT_FOUND
+                    {'error': 'User is not a member of this organization.'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
+            conversation.assigned_to = membership.user
         else:
             conversation.assigned_to = None
 
@@ -172,15 +212,23 @@ class ConversationViewSet(viewsets.ModelViewSet):
         return Response(ConversationDetailSerializer(conversation).data)
 
 
+class MessagePagination(CursorPagination):
+    # Seeks on the (conversation, created_at) index, however long the thread
+    ordering = '-created_at'
+    page_size = 50
+
+
 class MessageViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing messages within a conversation.
+    The list is cursor-paginated, newest first.
     """
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MessagePagination
 
     def get_queryset(self):
         conversation_id = self.kwargs.get('conversation_pk')
-        return Message.objects.filter(conversation_id=conversation_id)
+        return _with_sent_by_name(Message.objects.filter(conversation_id=conversation_id))
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -272,9 +320,15 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_read(self, request, conversation_pk=None):
         """Mark all customer messages in conversation as read."""
-        Message.objects.filter(
+        marked = Message.objects.filter(
             conversation_id=conversation_pk,
             sender=MessageSender.CUSTOMER,
             is_read=False
         ).update(is_read=True, read_at=timezone.now())
+        if marked:
+            # Subtract what was marked rather than zeroing: a customer message
+            # arriving in between stays counted
+            Conversation.objects.filter(pk=conversation_pk).update(
+                unread_customer_count=Greatest(F('unread_customer_count') - marked, 0)
+            )
         return Response({'status': 'Messages marked as read.'})
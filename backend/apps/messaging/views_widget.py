@@ -161,9 +161,9 @@ class WidgetMessageView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Update session activity
+        # Session activity, saved below with the conversation link if one is made
         session.last_activity_at = timezone.now()
-        session.save(update_fields=['last_activity_at'])
+        session_fields = ['last_activity_at']
 
         # Get or create conversation
         conversation = session.conversation
@@ -178,21 +178,19 @@ class WidgetMessageView(APIView):
                 state=ConversationState.NEW,
             )
             session.conversation = conversation
-            session.save(update_fields=['conversation'])
+            session_fields.append('conversation')
         else:
-            # Update customer info if provided
-            updated = False
-            if serializer.validated_data.get('customer_name'):
-                conversation.customer_name = serializer.validated_data['customer_name']
-                updated = True
-            if serializer.validated_data.get('customer_email'):
-                conversation.customer_email = serializer.validated_data['customer_email']
-                updated = True
-            if serializer.validated_data.get('customer_phone'):
-                conversation.customer_phone = serializer.validated_data['customer_phone']
-                updated = True
-            if updated:
-                conversation.save()
+            # Update customer info if provided, writing only what changed
+            changed = [
+                field for field in ('customer_name', 'customer_email', 'customer_phone')
+                if serializer.validated_data.get(field)
+                and serializer.validated_data[field] != getattr(conversation, field)
+            ]
+            for field in changed:
+                setattr(conversation, field, serializer.validated_data[field])
+            if changed:
+                conversation.save(update_fields=changed + ['updated_at'])
+        session.save(update_fields=session_fields)
 
         # Create customer message
         customer_message = Message.objects.create(
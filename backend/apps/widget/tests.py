@@ -0,0 +1,72 @@
+"""
+Tests for the embeddable website widget API.
+"""
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Organization
+from apps.handoff.models import HandoffAlert
+from apps.messaging.models import Channel, Conversation, Message, MessageSender, WidgetSession
+
+
+class WidgetMessageTest(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Widget Org")
+        # Locked for a human agent, so the AI is not called
+        self.conversation = Conversation.objects.create(
+            organization=org, channel=Channel.WEBSITE, is_locked=True,
+        )
+        self.session = WidgetSession.objects.create(organization=org, conversation=self.conversation)
+        self.client = APIClient()
+
+    def test_message_resolves_session_in_one_query(self):
+        payload = {
+            "session_id": str(self.session.id),
+            "conversation_id": str(self.conversation.id),
+            "content": "hello",
+        }
+        # session with conversation and organization + INSERT + last message UPDATE
+        with self.assertNumQueries(3):
+            response = self.client.post("/api/v1/widget/message/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_content, "hello")
+        self.assertEqual(self.conversation.last_message_sender, MessageSender.CUSTOMER)
+
+        response = self.client.get(
+            f"/api/v1/widget/conversation/{self.conversation.id}/", {"session_id": str(self.session.id)},
+        )
+        self.assertEqual([m["content"] for m in response.data["messages"]], ["hello"])
+        self.assertEqual(Message.objects.count(), 1)
+
+
+class WidgetHandoffTest(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Widget Handoff Org")
+        self.conversation = Conversation.objects.create(organization=org, channel=Channel.WEBSITE)
+        self.session = WidgetSession.objects.create(organization=org, conversation=self.conversation)
+        self.client = APIClient()
+
+    @mock.patch("apps.widget.views.AIService")
+    def test_repeat_handoff_reuses_open_alert(self, mock_ai_cls):
+        # An agent handed the conversation back without resolving its alert
+        alert = HandoffAlert.objects.create(
+            conversation=self.conversation, priority=HandoffAlert.Priority.LOW, reason="earlier",
+        )
+        mock_ai_cls.return_value.process_message.return_value = {
+            "content": "Let me get a person for you.", "needs_handoff": True,
+            "handoff_reason": "complaint", "confidence": 0.9,
+        }
+        response = self.client.post("/api/v1/widget/message/", {
+            "session_id": str(self.session.id),
+            "conversation_id": str(self.conversation.id),
+            "content": "This is unacceptable",
+        }, format="json")
+        self.assertTrue(response.data["handoff_initiated"])
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.state, "human_handoff")
+        self.assertEqual(HandoffAlert.objects.get(), alert)
+        alert.refresh_from_db()
+        self.assertEqual(alert.priority, HandoffAlert.Priority.HIGH)
@@ -113,9 +113,12 @@ class WidgetMessageView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Validate session
+        # Validate session; the conversation and organization are both
+        # used below, so fetch them with it
         try:
-            session = WidgetSession.objects.get(
+            session = WidgetSession.objects.select_related(
+                'conversation', 'organization'
+            ).get(
                 id=session_id,
                 conversation_id=conversation_id
             )
@@ -127,17 +130,14 @@ class WidgetMessageView(APIView):
 
         conversation = session.conversation
 
-        # Create customer message
+        # Create customer message (which also records it as the
+        # conversation's last message, see messaging/signals.py)
         customer_message = Message.objects.create(
             conversation=conversation,
             sender='customer',
             content=content,
         )
 
-        # Update conversation timestamps
-        conversation.last_message_at = customer_message.created_at
-        conversation.save(update_fields=['last_message_at', 'updated_at'])
-
         response_data = {
             'message_id': str(customer_message.id),
             'response': None,
@@ -167,15 +167,18 @@ class WidgetMessageView(APIView):
 
                 # Handle handoff if needed
                 if ai_result.get('needs_handoff'):
-                    from apps.handoff.models import HandoffAlert
-                    HandoffAlert.objects.create(
+                    # Reuses (and re-prioritizes) an alert still open from an
+                    # earlier handoff, as the other channels do
+                    from apps.handoff.services import create_alert_from_ai_response
+                    alert = create_alert_from_ai_response(
                         conversation=conversation,
-                        reason=ai_result.get('handoff_reason', 'ai_requested'),
-                        triggered_by_ai=True,
+                        ai_response=ai_result,
+                        user_message=content,
                     )
-                    conversation.state = 'human_handoff'
-                    conversation.save(update_fields=['state', 'updated_at'])
-                    response_data['handoff_initiated'] = True
+                    if alert:
+                        conversation.state = 'human_handoff'
+                        conversation.save(update_fields=['state', 'updated_at'])
+                        response_data['handoff_initiated'] = True
 
             except Exception as e:
                 # Log error but don't fail the request
@@ -273,7 +276,9 @@ class WidgetLanguageView(APIView):
             return Response({'ok': True})  # graceful no-op
 
         try:
-            session = WidgetSession.objects.get(id=session_token)
+            session = WidgetSession.objects.select_related(
+                'conversation', 'organization'
+            ).get(id=session_token)
         except (WidgetSession.DoesNotExist, ValueError):
             return Response({'ok': True})
 
@@ -306,7 +311,7 @@ class WidgetConversationView(APIView):
 
         # Validate session
         try:
-            session = WidgetSession.objects.get(
+            session = WidgetSession.objects.select_related('conversation').get(
                 id=session_id,
                 conversation_id=conversation_id
             )